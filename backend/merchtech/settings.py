@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'products.metrics.MetricsMiddleware',  # outermost, so latency covers the whole stack
+    'products.shadow.ActiveDatabaseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,14 +82,75 @@ WSGI_APPLICATION = 'merchtech.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# `load_kpis --shadow` builds each dataset into a new db-<timestamp>.sqlite3 and then names it
+# in DATABASE_POINTER_FILE; the file named there (db.sqlite3 until the first such load) is live.
+
+DATABASE_POINTER_FILE = BASE_DIR / 'db.current'
+
+
+def _active_database():
+    try:
+        return BASE_DIR / DATABASE_POINTER_FILE.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return BASE_DIR / 'db.sqlite3'
+
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': _active_database(),
     }
 }
 
 
+# Caching
+# Dashboard responses are cached per filter set and dataset version (bumped by every
+# load_kpis run). Set DASHBOARD_CACHE=file to share entries between processes on disk.
+
+DASHBOARD_CACHE_BACKENDS = {
+    'memory': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # LRU eviction
+        'LOCATION': 'merchtech-dashboard',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 256},
+    },
+    'file': {
+        'BACKEND': 'products.cache.LRUFileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'dashboard',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1024},
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': DASHBOARD_CACHE_BACKENDS[os.environ.get('DASHBOARD_CACHE', 'memory')],
+}
+
+# Threads evaluating the blocks of the async dashboard (/async/, served under ASGI) concurrently
+DASHBOARD_BLOCK_WORKERS = 4
+
+
+# Background report jobs
+# Finished exports are written here and reused per dataset version and filter set.
+
+REPORTS_ROOT = BASE_DIR / 'reports'
+REPORT_WORKERS = 2
+# Seconds after which a queued or running report job is treated as abandoned and rebuilt
+REPORT_JOB_TIMEOUT = 15 * 60
+
+
+# Request metrics, scraped from /metrics in the Prometheus text format (local addresses only).
+# Set METRICS_SLOW_REQUEST_SECONDS to log a query / section breakdown for slower requests.
+
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_SLOW_REQUEST_SECONDS = (
+    float(os.environ['METRICS_SLOW_REQUEST_SECONDS']) if os.environ.get('METRICS_SLOW_REQUEST_SECONDS') else None
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,94 @@
+from django.db import connection, transaction
+
+from .ingestion import iter_batches
+from .models import Product, Return, Review, Sale
+
+AGGREGATE_FIELDS = [
+    "total_gmv", "total_units", "total_refunds", "average_rating",
+    "total_returns", "review_count", "rating_total",
+]
+# (source model, SET clause, grouped columns) for each UPDATE ... FROM pass
+AGGREGATE_SOURCES = (
+    (
+        Sale,
+        "total_gmv = source.gmv, total_units = source.units, total_refunds = source.refunds",
+        # total_refunds is an integer column: truncate the float sum as IntegerField's int() would
+        "SUM(gmv) AS gmv, SUM(units_sold) AS units, CAST(SUM(refunds) AS INTEGER) AS refunds",
+    ),
+    (
+        Review,
+        "review_count = source.reviews, rating_total = source.total, "
+        "average_rating = ROUND(CAST(source.total AS REAL) / source.reviews, 2)",
+        "COUNT(*) AS reviews, SUM(rating) AS total",
+    ),
+    (Return, "total_returns = source.total", 'SUM("count") AS total'),
+)
+
+
+def refresh_product_aggregates(asins=None, chunk_size=2000):
+    """
+    Recompute total_gmv, total_units, total_refunds and average_rating, plus the
+    total_returns / review_count / rating_total rollups, for every product
+    (or only ``asins``) with set-based UPDATEs.
+
+    Each pass resets the fields and then runs one ``UPDATE ... FROM`` per source table
+    joined to its per-product GROUP BY, so the database does the whole job in four
+    statements and no product row round-trips through Python. ``asins`` are handled
+    ``chunk_size`` at a time to stay under the bound-parameter limit.
+    Returns the number of products updated.
+    """
+    if asins is None:
+        return _apply_aggregates(Product.objects.all())
+    updated = 0
+    for chunk in iter_batches(asins, chunk_size):
+        updated += _apply_aggregates(Product.objects.filter(asin__in=chunk))
+    return updated
+
+
+def iter_product_chunks(asins=None, chunk_size=2000):
+    """
+    Yield lists of products: the whole table keyset-paginated in primary-key order,
+    or only ``asins`` looked up ``chunk_size`` at a time.
+    """
+    if asins is not None:
+        for chunk in iter_batches(asins, chunk_size):
+            yield list(Product.objects.filter(asin__in=chunk))
+        return
+
+    last_id = 0
+    while True:
+        products = list(Product.objects.filter(id__gt=last_id).order_by("id")[:chunk_size])
+        if not products:
+            return
+        yield products
+        last_id = products[-1].id
+
+
+def _apply_aggregates(products):
+    # One transaction per pass, so readers never see the zeroed fields between statements
+    with transaction.atomic():
+        return _update_aggregates(products)
+
+
+def _update_aggregates(products):
+    updated = products.update(**dict.fromkeys(AGGREGATE_FIELDS, 0))
+    if not updated:
+        return 0
+
+    restrict, params = "", ()
+    if products.query.has_filters():
+        ids, params = products.values("id").query.sql_with_params()
+        restrict = f"WHERE product_id IN ({ids})"
+    quote = connection.ops.quote_name
+    table = quote(Product._meta.db_table)
+    with connection.cursor() as cursor:
+        # UPDATE ... FROM needs SQLite 3.33+ (Django 5.2 itself accepts 3.31)
+        for model, assignments, columns in AGGREGATE_SOURCES:
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} "
+                f"FROM (SELECT product_id, {columns} FROM {quote(model._meta.db_table)} "
+                f"{restrict} GROUP BY product_id) AS source "
+                f"WHERE {table}.id = source.product_id",
+                params,
+            )
+    return updated
@@ -0,0 +1,62 @@
+from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
+
+from .filters import dashboard_filters, filter_products
+from .models import Return, Sale, SuggestedAction
+from .serializers import ProductSerializer, ReturnSerializer, SaleSerializer, SuggestedActionSerializer
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Opaque-cursor pagination over the primary key: each page is one indexed range scan
+    (``WHERE id > cursor ORDER BY id LIMIT n``) with no COUNT query, however deep the client pages.
+    """
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class FilteredViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only endpoint whose rows are limited by the dashboard's product / issue / rating filters."""
+    pagination_class = KeysetPagination
+
+    def filtered_products(self):
+        return filter_products(dashboard_filters(self.request))
+
+
+class ProductViewSet(FilteredViewSet):
+    serializer_class = ProductSerializer
+    lookup_field = "asin"
+
+    def get_queryset(self):
+        return self.filtered_products().select_related("suggested_action_entry")
+
+
+class ProductChildViewSet(FilteredViewSet):
+    """Rows belonging to the filtered products, joined to their product in the same query."""
+    model = None
+    related = ("product",)
+
+    def get_queryset(self):
+        queryset = self.model.objects.select_related(*self.related)
+        products = self.filtered_products()
+        if products.query.has_filters():
+            queryset = queryset.filter(product__in=products.values("pk"))
+        return queryset
+
+
+class SaleViewSet(ProductChildViewSet):
+    model = Sale
+    serializer_class = SaleSerializer
+
+
+class ReturnViewSet(ProductChildViewSet):
+    model = Return
+    related = ("product", "reason")
+    serializer_class = ReturnSerializer
+
+
+class SuggestedActionViewSet(ProductChildViewSet):
+    model = SuggestedAction
+    serializer_class = SuggestedActionSerializer
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from .metrics import install_query_recorder
+
+        # Every connection, on any thread, charges its SQL to the request being served
+        connection_created.connect(install_query_recorder, dispatch_uid="products.metrics")
@@ -0,0 +1,156 @@
+import os
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.views.decorators.http import condition
+
+from .models import DatasetLoad
+
+DASHBOARD_CACHE_ALIAS = "dashboard"
+_MISSING = object()
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    File-based cache that evicts least-recently-used entries instead of random ones.
+    Every hit refreshes the entry file's mtime, and culling removes the oldest files first.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
+
+
+class CacheStats:
+    """Thread-safe, per-process hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+dashboard_stats = CacheStats()
+
+
+def current_dataset_version():
+    """Id of the latest successful load_kpis run (0 before the first one)."""
+    return DatasetLoad.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def request_dataset_load(request):
+    """
+    ``(version, loaded_at)`` of the latest load, looked up once per request so the
+    ETag, Last-Modified and cache-key checks share a single query.
+    """
+    if not hasattr(request, "_dataset_load"):
+        latest = DatasetLoad.objects.order_by("-id").values_list("id", "loaded_at").first()
+        request._dataset_load = latest or (0, None)
+    return request._dataset_load
+
+
+def dataset_etag(request, *args, **kwargs):
+    return f"dataset-v{request_dataset_load(request)[0]}"
+
+
+def dataset_last_modified(request, *args, **kwargs):
+    return request_dataset_load(request)[1]
+
+
+_dataset_condition = condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified)
+
+
+def dataset_conditional(view):
+    """Answers conditional GETs with 304 Not Modified while the loaded dataset is unchanged."""
+    conditional = _dataset_condition(view)
+    if not iscoroutinefunction(view):
+        return conditional
+
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        # Look the version up off the event loop; the ETag / Last-Modified checks then reuse it
+        await sync_to_async(request_dataset_load)(request)
+        return await conditional(request, *args, **kwargs)
+
+    return inner
+
+
+def dashboard_cache_key(name, filters, version):
+    """Cache key for a dashboard artefact, scoped to normalised filters and dataset version."""
+    # URL-encoded so filter values with spaces still make portable (memcached-safe) keys
+    return f"{name}:v{version}:" + urlencode(sorted(filters.items()))
+
+
+def cached(name, filters, compute, version=None):
+    """
+    Return the cached value for ``name`` / ``filters`` at the current dataset version,
+    computing and storing it on a miss. Returns ``(value, hit)``.
+
+    Entries never expire by time: a new load bumps the version so stale keys are simply
+    never read again and age out through the backend's LRU eviction.
+    """
+    if version is None:
+        version = current_dataset_version()
+    cache = caches[DASHBOARD_CACHE_ALIAS]
+    key = dashboard_cache_key(name, filters, version)
+
+    value = cache.get(key, _MISSING)
+    hit = value is not _MISSING
+    dashboard_stats.record(hit)
+    if not hit:
+        value = compute()
+        cache.set(key, value, timeout=None)
+    return value, hit
+
+
+async def acached(name, filters, compute, version):
+    """Async :func:`cached`; ``compute`` is a coroutine function."""
+    cache = caches[DASHBOARD_CACHE_ALIAS]
+    key = dashboard_cache_key(name, filters, version)
+
+    value = await cache.aget(key, _MISSING)
+    hit = value is not _MISSING
+    dashboard_stats.record(hit)
+    if not hit:
+        value = await compute()
+        await cache.aset(key, value, timeout=None)
+    return value, hit
@@ -0,0 +1,115 @@
+from django.db.models import Min, Sum
+
+from .models import Return, ReturnReasonTotal, Sale
+from .periods import weekly_series
+from .trends import WeeklyPivot
+
+REASON_COLORS = ("#ff6384", "#ff9f40", "#ffcd56", "#4bc0c0", "#36a2eb", "#9966ff")
+OTHER_COLOR = "#c9cbcf"
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of ``[(x, y)]`` (ordered by x) to at most
+    ``threshold`` points. The first and last points are kept and, from each bucket in
+    between, the point forming the largest triangle with its neighbours, so peaks and
+    dips survive where plain averaging would flatten them.
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points.")
+    count = len(points)
+    if count <= threshold:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # The next bucket is represented by its average point (the last point for the final bucket)
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, count)
+        next_points = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        anchor_x, anchor_y = points[anchor]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((anchor_x - avg_x) * (y - anchor_y) - (anchor_x - x) * (avg_y - anchor_y))
+            if area > best_area:
+                best, best_area = index, area
+        sampled.append(points[best])
+        anchor = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def gmv_trend(products, top, max_points):
+    """
+    Chart.js line-chart payload for the ``top`` products by GMV, plus one "Other" series
+    with the remaining products' weekly GMV, each downsampled to ``max_points``. The
+    payload size depends on ``top`` and ``max_points`` only, never on catalogue size or
+    history length. Costs three queries (four when there is an "Other" series).
+    """
+    leaders = list(products.order_by("-total_gmv", "id").values_list("id", "name")[:top + 1])
+    has_other = len(leaders) > top
+    leaders = leaders[:top]
+
+    pivot = WeeklyPivot(Sale.objects.filter(product_id__in=[pk for pk, _ in leaders]))
+    datasets = [
+        {
+            "label": name,
+            "data": _points([(week, pivot.cells.get((pk, week), (0, 0))[0]) for week in pivot.weeks], max_points),
+            "borderWidth": 2,
+        }
+        for pk, name in leaders
+    ]
+
+    # Everyone else is the weekly total less the leaders (rollup table when unfiltered)
+    series = weekly_series(products if products.query.has_filters() else None)
+    if has_other:
+        others = products.count() - top
+        datasets.append({
+            "label": f"Other ({others} products)",
+            "data": _points([(week, gmv - pivot.week_total(week)) for week, gmv, *_ in series], max_points),
+            "borderWidth": 2,
+            "borderDash": [6, 4],
+            "borderColor": OTHER_COLOR,
+        })
+    weeks = [week for week, *_ in series]
+    return {"datasets": datasets, "weeks": [weeks[0], weeks[-1]] if weeks else [], "points": max_points}
+
+
+def reason_breakdown(products, top):
+    """
+    Chart.js doughnut payload of the ``top`` return reasons by count plus an "Other"
+    slice for the rest, from one grouped query (the rollup table when unfiltered).
+    """
+    if products.query.has_filters():
+        rows = (
+            Return.objects.filter(product__in=products)
+            .values("reason_id")
+            .annotate(total=Sum("count"), name=Min("reason__name"))
+            .values_list("name", "total")
+        )
+    else:
+        rows = ReturnReasonTotal.objects.values_list("reason__name", "total")
+    reasons = sorted(rows.order_by(), key=lambda row: (-row[1], row[0]))
+
+    slices = reasons[:top]
+    other = sum(total for _, total in reasons[top:])
+    colors = [REASON_COLORS[index % len(REASON_COLORS)] for index in range(len(slices))]
+    if other:
+        slices.append((f"Other ({len(reasons) - top} reasons)", other))
+        colors.append(OTHER_COLOR)
+    return {
+        "total": sum(total for _, total in reasons),
+        "labels": [f"{name} ({total} Returns)" for name, total in slices],
+        "datasets": [{"data": [total for _, total in slices], "backgroundColor": colors}],
+    }
+
+
+def _points(series, max_points):
+    return [{"x": week, "y": round(value, 2)} for week, value in lttb(series, max_points)]
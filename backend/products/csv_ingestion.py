@@ -0,0 +1,234 @@
+import os
+
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models import IntegerField, Sum
+from django.db.models.functions import Cast
+
+from .models import Product, Return, ReturnReason, Review, Sale
+
+FEED_FILES = {
+    "sales": "sde2_sales.csv",
+    "reviews": "sde2_reviews.csv",
+    "returns": "sde2_returns.csv",
+}
+# Columns read from each feed; text columns are kept verbatim, the rest are coerced to numbers
+FEED_COLUMNS = {
+    "sales": {"asin": str, "week": int, "units_sold": int, "gmv": float, "refunds": float},
+    "reviews": {"asin": str, "review_text": str, "rating": int},
+    "returns": {"asin": str, "return_reason": str, "count": int},
+}
+SALES_TOTALS = ("total_gmv", "total_units", "total_refunds")
+PRODUCT_COLUMNS = (
+    "id", "asin", "name", "fingerprint", "average_rating", "total_gmv", "total_units",
+    "total_refunds", "total_returns", "review_count", "rating_total",
+)
+
+
+def feed_paths(directory):
+    """``{feed: path}`` of the three sde2_*.csv files in ``directory``; raises if one is missing."""
+    paths = {feed: os.path.join(directory, name) for feed, name in FEED_FILES.items()}
+    missing = [path for path in paths.values() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"CSV feed not found at: {', '.join(missing)}")
+    return paths
+
+
+def read_feed(path, feed, chunk_rows):
+    """
+    Yield ``(chunk, skipped)`` for one feed, ``chunk_rows`` rows at a time: a DataFrame
+    with stripped ASINs and numeric columns coerced (blank or invalid values become 0),
+    plus the number of rows dropped for a missing ASIN.
+    """
+    columns = FEED_COLUMNS[feed]
+    reader = pd.read_csv(
+        path,
+        usecols=list(columns),
+        dtype={name: str for name, kind in columns.items() if kind is str},
+        keep_default_na=False,
+        chunksize=chunk_rows,
+    )
+    with reader:
+        for chunk in reader:
+            chunk["asin"] = chunk["asin"].str.strip()
+            present = chunk["asin"] != ""
+            skipped = int((~present).sum())
+            if skipped:
+                chunk = chunk[present]
+            for name, kind in columns.items():
+                if kind is not str:
+                    chunk[name] = pd.to_numeric(chunk[name], errors="coerce").fillna(0).astype(kind)
+            yield chunk, skipped
+
+
+def collect_asins(paths, chunk_rows):
+    """Every distinct ASIN across the feeds, in first-seen order."""
+    seen = []
+    for feed in FEED_FILES:
+        reader = pd.read_csv(
+            paths[feed], usecols=["asin"], dtype=str, keep_default_na=False, chunksize=chunk_rows
+        )
+        with reader:
+            for chunk in reader:
+                seen.append(chunk["asin"].str.strip().unique())
+    if not seen:
+        return pd.Index([], dtype=object)
+    asins = pd.unique(np.concatenate(seen))
+    return pd.Index(asins[asins != ""])
+
+
+def insert_rows(model, columns, frame, conflict_fields=None):
+    """
+    Insert ``frame[columns]`` into ``model``'s table with one executemany, bypassing model
+    instantiation. With ``conflict_fields``, a row that collides on them replaces the
+    existing row's other columns (the "last row wins" rule of the JSON loader).
+    """
+    if frame.empty:
+        return 0
+    quote = connection.ops.quote_name
+    names = [quote(model._meta.get_field(column).column) for column in columns]
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(names)}) "
+        f"VALUES ({', '.join(['%s'] * len(names))})"
+    )
+    if conflict_fields:
+        keys = [quote(model._meta.get_field(field).column) for field in conflict_fields]
+        updates = [name for name in names if name not in keys]
+        sql += f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + ", ".join(
+            f"{name} = excluded.{name}" for name in updates
+        )
+    # tolist() hands the driver plain Python scalars, which it can bind (numpy integers it cannot)
+    rows = list(zip(*(frame[column].tolist() for column in columns)))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    return len(rows)
+
+
+class CsvLoad:
+    """
+    One CSV load: maps ASINs to the product ids they will be inserted under and keeps
+    per-product totals. Review and return totals are accumulated with vectorized
+    group-bys as each chunk is written; sales totals are summed by :meth:`sum_sales`.
+    Child rows are written before their products, so the whole load must run in one
+    transaction (foreign keys are checked at commit).
+    """
+
+    def __init__(self, asins, first_id):
+        self.asins = asins
+        self.first_id = first_id
+        size = len(asins)
+        self.totals = {
+            "total_gmv": np.zeros(size),
+            "total_units": np.zeros(size, dtype=np.int64),
+            "total_refunds": np.zeros(size, dtype=np.int64),
+            "review_count": np.zeros(size, dtype=np.int64),
+            "rating_total": np.zeros(size, dtype=np.int64),
+            "total_returns": np.zeros(size, dtype=np.int64),
+        }
+        self._returns = []
+
+    def _positions(self, chunk):
+        return self.asins.get_indexer(chunk["asin"])
+
+    def _accumulate(self, positions, values):
+        """Add ``{total: column}`` per product, grouped within the chunk first."""
+        grouped = pd.DataFrame(values).groupby(positions, sort=False).sum()
+        index = grouped.index.to_numpy()
+        for name in values:
+            self.totals[name][index] += grouped[name].to_numpy()
+
+    def write_sales(self, chunk):
+        # Within a chunk the last row of a repeated week wins; across chunks the upsert does
+        chunk = chunk.drop_duplicates(["asin", "week"], keep="last")
+        chunk = chunk.assign(product_id=self._positions(chunk) + self.first_id)
+        return insert_rows(
+            Sale, ["product_id", "week", "units_sold", "gmv", "refunds"], chunk,
+            conflict_fields=["product", "week"],
+        )
+
+    def write_reviews(self, chunk):
+        positions = self._positions(chunk)
+        chunk = chunk.assign(product_id=positions + self.first_id, review_text=chunk["review_text"].str.strip())
+        self._accumulate(positions, {
+            "review_count": np.ones(len(chunk), dtype=np.int64),
+            "rating_total": chunk["rating"].to_numpy(),
+        })
+        return insert_rows(Review, ["product_id", "review_text", "rating"], chunk)
+
+    def add_returns(self, chunk):
+        """Merge a chunk's duplicate (ASIN, reason) rows; they are written by :meth:`write_returns`."""
+        chunk = chunk.assign(
+            position=self._positions(chunk), return_reason=chunk["return_reason"].str.strip()
+        )
+        chunk = chunk[chunk["return_reason"] != ""]
+        self._returns.append(
+            chunk.groupby(["position", "return_reason"], sort=False)["count"].sum().reset_index()
+        )
+        return len(chunk)
+
+    def write_returns(self):
+        """Sum duplicate reasons across all chunks and insert one row per (product, reason)."""
+        if not self._returns:
+            return 0
+        merged = (
+            pd.concat(self._returns)
+            .groupby(["position", "return_reason"], sort=False)["count"].sum()
+            .reset_index()
+        )
+        self._returns = []
+        reason_ids = ReturnReason.objects.intern(merged["return_reason"].unique().tolist())
+        merged["product_id"] = merged["position"] + self.first_id
+        merged["reason_id"] = merged["return_reason"].map(reason_ids)
+        self._accumulate(merged["position"].to_numpy(), {"total_returns": merged["count"].to_numpy()})
+        return insert_rows(Return, ["product_id", "reason_id", "count"], merged)
+
+    def sum_sales(self):
+        """
+        Take the sales totals from one grouped SUM over the written rows: repeated weeks
+        are already resolved there, and the sums (refunds truncated to an integer) are
+        computed exactly as refresh_product_aggregates computes them for JSON loads.
+        """
+        rows = (
+            Sale.objects.values("product_id")
+            .annotate(gmv=Sum("gmv"), units=Sum("units_sold"), refunds=Cast(Sum("refunds"), IntegerField()))
+            .values_list("product_id", "gmv", "units", "refunds")
+            .order_by()
+        )
+        frame = pd.DataFrame(rows, columns=["product_id", *SALES_TOTALS])
+        positions = frame.pop("product_id").to_numpy() - self.first_id
+        for name in SALES_TOTALS:
+            self.totals[name][positions] = frame[name].to_numpy()
+
+    def write_products(self, names=None, chunk_rows=100_000):
+        """Insert every product with its final totals; ``names`` maps ASINs to known names."""
+        totals = self.totals
+        review_count = totals["review_count"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(review_count > 0, np.round(totals["rating_total"] / review_count, 2), 0.0)
+        products = pd.DataFrame({
+            "id": np.arange(self.first_id, self.first_id + len(self.asins)),
+            "asin": self.asins,
+            "name": (
+                self.asins.to_series().map(names).fillna("Unnamed Product").to_numpy() if names else "Unnamed Product"
+            ),
+            # No JSON record to hash, so a later incremental JSON load rewrites these products
+            "fingerprint": "",
+            "average_rating": average,
+            "total_gmv": totals["total_gmv"],
+            "total_units": totals["total_units"],
+            "total_refunds": totals["total_refunds"],
+            "total_returns": totals["total_returns"],
+            "review_count": review_count,
+            "rating_total": totals["rating_total"],
+        })
+        written = 0
+        for start in range(0, len(products), chunk_rows):
+            written += insert_rows(Product, PRODUCT_COLUMNS, products.iloc[start:start + chunk_rows])
+        return written
+
+
+def next_product_id():
+    """First id for products created by a CSV load."""
+    last = Product.objects.order_by("-id").values_list("id", flat=True).first()
+    return (last or 0) + 1
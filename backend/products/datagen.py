@@ -0,0 +1,114 @@
+import csv
+import json
+import os
+import random
+from datetime import datetime
+
+PRODUCT_TYPES = [
+    "Vacuum Cleaner", "LED Monitor", "Office Chair", "Standing Desk", "Air Purifier",
+    "Coffee Maker", "Wireless Earbuds", "Desk Lamp", "Blender", "Electric Kettle",
+]
+REVIEW_TEXTS = [
+    "Great product", "Works as expected", "Good value", "Comfortable", "Fast delivery",
+    "Wrong item", "Color mismatch", "Not as described", "Arrived damaged", "Broken on arrival",
+    "Delivery was late", "Size is too small",
+]
+RETURN_REASONS = [
+    "Late delivery", "Defective product", "Damaged item", "Wrong color",
+    "Size mismatch", "Delayed shipment", "Poor quality",
+]
+
+
+def generate_products(products, weeks=12, reviews=5, returns=3, seed=42):
+    """
+    Yield ``products`` synthetic product entries in the load_kpis JSON schema.
+
+    The same arguments always produce the same entries. Each product gets ``weeks`` weekly
+    sales rows, and on average ``reviews`` reviews and ``returns`` return rows (drawn
+    uniformly between 0 and twice the average).
+    """
+    rng = random.Random(seed)
+    for index in range(products):
+        asin = f"ASIN-{100000 + index}"
+        # A per-product quality level keeps ratings, refunds and returns loosely correlated
+        quality = rng.random()
+        base_units = rng.randint(5, 60)
+        price = rng.choice([19, 29, 49, 79, 129, 249])
+        yield {
+            "asin": asin,
+            "product": f"{rng.choice(PRODUCT_TYPES)} {index}",
+            "reviews": [
+                {
+                    "asin": asin,
+                    "review_text": rng.choice(REVIEW_TEXTS),
+                    "rating": max(1, min(5, round(1 + 4 * quality + rng.uniform(-1.5, 1.5)))),
+                }
+                for _ in range(rng.randint(0, 2 * reviews))
+            ],
+            "returns": [
+                {"asin": asin, "return_reason": rng.choice(RETURN_REASONS), "count": rng.randint(1, 9)}
+                for _ in range(rng.randint(0, 2 * returns))
+            ],
+            "sales": [
+                _sale(rng, asin, week, base_units, price, quality)
+                for week in range(1, weeks + 1)
+            ],
+        }
+
+
+def _sale(rng, asin, week, base_units, price, quality):
+    units = max(0, int(base_units * rng.uniform(0.6, 1.4)))
+    return {
+        "asin": asin,
+        "week": week,
+        "units_sold": units,
+        "gmv": units * price,
+        "refunds": rng.randint(0, max(1, round(units * (1 - quality) * 0.2))),
+    }
+
+
+def write_dataset(stream, products, weeks=12, reviews=5, returns=3, seed=42, version="synthetic"):
+    """
+    Write a complete dataset to the text ``stream`` one product at a time, so feeds far
+    larger than memory can be produced. Returns the number of products written.
+    """
+    header = {"version": version, "generated_at": datetime(2025, 1, 1).isoformat()}
+    stream.write(json.dumps(header)[:-1] + ', "products": [\n')
+    count = 0
+    for entry in generate_products(products, weeks, reviews, returns, seed):
+        if count:
+            stream.write(",\n")
+        stream.write(json.dumps(entry))
+        count += 1
+    stream.write("\n]}\n")
+    return count
+
+
+CSV_FEEDS = {
+    "sales": ("sde2_sales.csv", ("asin", "week", "units_sold", "gmv", "refunds")),
+    "reviews": ("sde2_reviews.csv", ("asin", "review_text", "rating")),
+    "returns": ("sde2_returns.csv", ("asin", "return_reason", "count")),
+}
+
+
+def write_csv_feeds(directory, products, weeks=12, reviews=5, returns=3, seed=42):
+    """
+    Write the same entries as :func:`write_dataset` as the three sde2_*.csv feeds in
+    ``directory`` (product names are not part of the feeds). Returns the number of products.
+    """
+    os.makedirs(directory, exist_ok=True)
+    streams = {feed: open(os.path.join(directory, name), "w", newline="", encoding="utf-8")
+               for feed, (name, _) in CSV_FEEDS.items()}
+    try:
+        writers = {feed: csv.writer(stream) for feed, stream in streams.items()}
+        for feed, (_, columns) in CSV_FEEDS.items():
+            writers[feed].writerow(columns)
+        count = 0
+        for entry in generate_products(products, weeks, reviews, returns, seed):
+            for feed, (_, columns) in CSV_FEEDS.items():
+                writers[feed].writerows([row[column] for column in columns] for row in entry[feed])
+            count += 1
+    finally:
+        for stream in streams.values():
+            stream.close()
+    return count
@@ -0,0 +1,38 @@
+from .models import Product, Return
+from .periods import DEFAULT_PERIOD, PERIODS
+
+RATING_BANDS = ("low", "mid", "high")
+
+
+def dashboard_filters(request):
+    """Normalised product / issue / rating filters from the query string ('' means no filter)."""
+    rating = request.GET.get("rating", "").strip()
+    return {
+        "product": request.GET.get("product", "").strip(),
+        "issue": request.GET.get("issue", "").strip(),
+        "rating": rating if rating in RATING_BANDS else "",
+    }
+
+
+def dashboard_period(request):
+    """Comparison window of the KPI cards; not a filter, as every window is computed (and cached) at once."""
+    period = request.GET.get("period", "").strip()
+    return period if period in PERIODS else DEFAULT_PERIOD
+
+
+def filter_products(filters):
+    """Product queryset narrowed by normalised dashboard filters."""
+    queryset = Product.objects.all()
+    if filters["product"]:
+        queryset = queryset.filter(asin=filters["product"])
+    if filters["issue"]:
+        # Index-only lookup on (reason, product) after resolving the name through its unique index
+        queryset = queryset.filter(pk__in=Return.objects.filter(reason__name=filters["issue"]).values("product_id"))
+    if filters["rating"] == "low":
+        queryset = queryset.filter(average_rating__lt=3)
+    elif filters["rating"] == "mid":
+        queryset = queryset.filter(average_rating__gte=3, average_rating__lte=4)
+    elif filters["rating"] == "high":
+        queryset = queryset.filter(average_rating__gt=4)
+
+    return queryset
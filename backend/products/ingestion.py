@@ -0,0 +1,265 @@
+import hashlib
+import json
+import multiprocessing
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_STRUCTURE = re.compile(r'[][{}"]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def _nested_value_pattern(depth):
+    """Regex matching a whole object or array nested at most ``depth`` levels, strings included."""
+    string = r'"(?:[^"\\]++|\\.)*+"'
+    body = r'(?:[^][{}"]++|' + string + r')*+'
+    for _ in range(depth - 1):
+        body = r'(?:[^][{}"]++|' + string + r'|\{' + body + r'\}|\[' + body + r'\])*+'
+    return re.compile(r'[{[]' + body + r'[]}]')
+
+
+# Product entries nest three levels deep (entry, sales list, sale), leaving one to spare;
+# deeper or partially buffered entries fall back to the bracket-counting scan.
+_ENTRY = _nested_value_pattern(4)
+
+
+class _StreamReader:
+    """
+    Minimal incremental JSON tokenizer over a text file.
+    Only the current chunk (plus any partially read value) is held in memory.
+    """
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed dataset: expected '{char}' but found '{found or 'EOF'}'.")
+        self.pos += 1
+
+    def skip(self, char):
+        """Consume ``char`` if it is the next token and report whether it was there."""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        """Decode the next complete JSON value, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                if not self._fill():
+                    raise ValueError(f"Malformed dataset: truncated or invalid value ({exc.msg}).") from exc
+                continue
+            # A number that ends exactly at the buffer edge may continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def raw_value(self):
+        """
+        Return the source text of the next JSON value without decoding it.
+        Objects and arrays are delimited by counting brackets outside of strings;
+        the text itself is only validated once it is decoded.
+        """
+        if self.peek() not in "{[":
+            return json.dumps(self.value())
+        match = _ENTRY.match(self.buffer, self.pos)
+        if match is not None:
+            self.pos = match.end()
+            return match.group()
+        depth = 0
+        index = self.pos
+        while True:
+            match = _STRUCTURE.search(self.buffer, index)
+            if match is None:
+                index = self._refill(len(self.buffer))
+                continue
+            char, index = match.group(), match.end()
+            if char == '"':
+                index = self._skip_string(index)
+            elif char in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    text = self.buffer[self.pos:index]
+                    self.pos = index
+                    return text
+
+    def _skip_string(self, index):
+        """Return the index just past the closing quote of a string whose body starts at ``index``."""
+        while True:
+            match = _STRING_END.search(self.buffer, index)
+            if match is None or match.end() == len(self.buffer) and match.group() == "\\":
+                # Keep a trailing backslash so the escaped character is read with it
+                index = self._refill(match.start() if match else len(self.buffer))
+            elif match.group() == "\\":
+                index = match.end() + 1
+            else:
+                return match.end()
+
+    def _refill(self, index):
+        """Read the next chunk and return ``index`` shifted to the compacted buffer."""
+        offset = self.pos
+        if not self._fill():
+            raise ValueError("Malformed dataset: truncated value.")
+        return index - offset
+
+
+def iter_products(path, header=None, chunk_size=1 << 16, raw=False):
+    """
+    Yield entries of the dataset's top-level ``products`` array one at a time.
+
+    Scalar top-level keys (``version``, ``generated_at``...) are stored in ``header``
+    when a dict is supplied, so callers can read them without loading the whole file.
+    With ``raw`` each entry is yielded as its undecoded JSON text instead.
+    """
+    with open(path, "r") as file:
+        reader = _StreamReader(file, chunk_size)
+        next_entry = reader.raw_value if raw else reader.value
+        reader.expect("{")
+        if reader.skip("}"):
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(":")
+
+            if key == "products":
+                reader.expect("[")
+                if not reader.skip("]"):
+                    while True:
+                        yield next_entry()
+                        if not reader.skip(","):
+                            reader.expect("]")
+                            break
+            else:
+                value = reader.value()
+                if header is not None:
+                    header[key] = value
+
+            if not reader.skip(","):
+                reader.expect("}")
+                break
+
+
+def iter_batches(iterable, size):
+    """Group an iterable into lists of at most ``size`` items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_record(item):
+    """
+    Normalise one raw product entry into ready-to-insert row tuples.
+    Mirrors the ORM semantics of the original loader: a repeated sales week keeps
+    its first position but takes the last values, and duplicate return reasons are summed.
+    Returns None when the entry has no ASIN.
+    """
+    asin = str(item.get("asin", "")).strip()
+    if not asin:
+        return None
+
+    sales = {}
+    for sale in item.get("sales", []):
+        sales[int(sale["week"])] = (sale["units_sold"], sale["gmv"], sale["refunds"])
+
+    reviews = [
+        (review.get("review_text", "").strip(), review.get("rating", 0))
+        for review in item.get("reviews", [])
+    ]
+
+    # Combine duplicate return reasons and sum their counts
+    merged_reasons = {}
+    for ret in item.get("returns", []):
+        reason = ret.get("return_reason", "").strip()
+        count = int(ret.get("count", 0))
+        if reason:
+            merged_reasons[reason] = merged_reasons.get(reason, 0) + count
+
+    record = {
+        "asin": asin,
+        "name": item.get("product", "Unnamed Product"),
+        "sales": [(week, *values) for week, values in sales.items()],
+        "reviews": reviews,
+        "returns": list(merged_reasons.items()),
+    }
+    record["fingerprint"] = fingerprint(record)
+    return record
+
+
+def fingerprint(record):
+    """Stable hash of a normalised record's name, sales, reviews and returns."""
+    payload = json.dumps(
+        [record["name"], record["sales"], record["reviews"], record["returns"]],
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _build_texts(texts):
+    try:
+        return [build_record(json.loads(text)) for text in texts]
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Malformed dataset: invalid value ({exc.msg}).") from exc
+
+
+def iter_record_batches(path, batch_size, workers=1, header=None):
+    """
+    Yield lists of normalised records (None for entries without an ASIN), one per batch.
+
+    With ``workers`` > 1 this process only finds entry boundaries: each batch is split
+    into contiguous slices of raw entry text that a process pool decodes and normalises,
+    and the slices are rejoined in input order, so the output is identical to a serial run.
+    The next batch is transformed while the caller is still writing the previous one.
+    """
+    if workers <= 1:
+        for batch in iter_batches(iter_products(path, header), batch_size):
+            yield [build_record(item) for item in batch]
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = None
+        for batch in iter_batches(iter_products(path, header, raw=True), batch_size):
+            step = -(-len(batch) // workers)
+            slices = [batch[start:start + step] for start in range(0, len(batch), step)]
+            submitted = pool.map_async(_build_texts, slices)
+            if pending is not None:
+                yield [record for part in pending.get() for record in part]
+            pending = submitted
+        if pending is not None:
+            yield [record for part in pending.get() for record in part]
@@ -0,0 +1,93 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from products.filters import filter_products
+from products.models import Return, ReturnReasonTotal, Sale
+from products.views import build_dashboard_context, build_gmv_chart, build_product_rows, build_reason_chart
+
+
+FILTER_SETS = {
+    "all products": {"product": "", "issue": "", "rating": ""},
+    "rating=low": {"product": "", "issue": "", "rating": "low"},
+    "rating=high": {"product": "", "issue": "", "rating": "high"},
+}
+
+
+class Command(BaseCommand):
+    """
+    Times the uncached dashboard work (KPIs, charts and product table) for a few
+    filter sets against the current database and prints the SQLite query plans of
+    the hottest queries, so schema and index changes can be compared before and after.
+    """
+
+    help = "Benchmarks the dashboard queries against the loaded dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per filter set; the median is reported (default: 5).",
+        )
+        parser.add_argument(
+            "--no-plans",
+            action="store_true",
+            help="Skip printing query plans.",
+        )
+
+    def handle(self, *args, **kwargs):
+        repeat = kwargs["repeat"]
+        if repeat < 1:
+            raise CommandError("--repeat must be a positive integer.")
+
+        filter_sets = dict(FILTER_SETS)
+        top_issue = ReturnReasonTotal.objects.order_by("-total").values_list("reason__name", flat=True).first()
+        if top_issue:
+            filter_sets["top issue"] = {"product": "", "issue": top_issue, "rating": ""}
+
+        self.stdout.write(f"⏱️ Dashboard build, median of {repeat} runs:")
+        for label, filters in filter_sets.items():
+            for block, build in (
+                ("kpis", build_dashboard_context),
+                ("gmv chart", build_gmv_chart),
+                ("reason chart", build_reason_chart),
+                ("product table", build_product_rows),
+            ):
+                timings = []
+                for _ in range(repeat):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        build(filters)
+                        timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"   {label:<14} {block:<14} {statistics.median(timings):>8.1f} ms  {len(queries):>3} queries"
+                )
+
+        if kwargs["no_plans"] or connection.vendor != "sqlite":
+            return
+
+        low = filter_products(FILTER_SETS["rating=low"])
+        leaders = list(low.order_by("-total_gmv", "id").values_list("id", flat=True)[:10])
+        plans = {
+            "rating filter": low.values("id"),
+            "issue filter": filter_products(filter_sets.get("top issue", FILTER_SETS["all products"])).values("id"),
+            "weekly totals (filtered)": (
+                Sale.objects.filter(product__in=low).values("week").annotate(Sum("gmv"), Sum("units_sold")).order_by()
+            ),
+            "gmv pivot (top products)": (
+                Sale.objects.filter(product_id__in=leaders)
+                .values("product_id", "week").annotate(Sum("gmv"), Sum("units_sold")).order_by()
+            ),
+            "return reasons (filtered)": (
+                Return.objects.filter(product__in=low).values("product_id").annotate(Sum("count")).order_by()
+            ),
+        }
+        self.stdout.write("\n🔍 Query plans:")
+        for label, queryset in plans.items():
+            self.stdout.write(f"   {label}:")
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"      {line}")
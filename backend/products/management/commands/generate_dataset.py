@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.datagen import write_csv_feeds, write_dataset
+
+
+class Command(BaseCommand):
+    """
+    Writes a deterministic synthetic dataset in the same JSON schema as
+    sde2_merchtech_dataset.txt, so load_kpis and the dashboard can be exercised
+    at production-like scale. The same options always produce the same file.
+    With --format csv, the same products are written as the three sde2_*.csv feeds.
+    """
+
+    help = "Generates a synthetic product dataset for load and performance testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the JSON dataset (or, with --format csv, the directory) to write.")
+        parser.add_argument("--products", type=int, default=10000, help="Number of products (default: 10000).")
+        parser.add_argument("--weeks", type=int, default=12, help="Weekly sales rows per product (default: 12).")
+        parser.add_argument("--reviews", type=int, default=5, help="Average reviews per product (default: 5).")
+        parser.add_argument("--returns", type=int, default=3, help="Average return rows per product (default: 3).")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+        parser.add_argument("--format", choices=("json", "csv"), default="json", help="Output format (default: json).")
+
+    def handle(self, *args, **kwargs):
+        for option in ("products", "weeks", "reviews", "returns"):
+            if kwargs[option] < 0:
+                raise CommandError(f"--{option} cannot be negative.")
+
+        options = {key: kwargs[key] for key in ("weeks", "reviews", "returns", "seed")}
+        if kwargs["format"] == "csv":
+            count = write_csv_feeds(kwargs["output"], kwargs["products"], **options)
+        else:
+            with open(kwargs["output"], "w", encoding="utf-8") as stream:
+                count = write_dataset(stream, kwargs["products"], **options)
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {count} products to {kwargs['output']}"))
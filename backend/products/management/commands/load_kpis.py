@@ -1,30 +1,225 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.utils import timezone
-from django.db.models import Sum
-from products.models import Product, Sale, Review, Return, SuggestedAction
-import json
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from products import shadow
+from products.csv_ingestion import CsvLoad, collect_asins, feed_paths, next_product_id, read_feed
+from products.aggregates import refresh_product_aggregates
+from products.ingestion import iter_batches, iter_record_batches
+from products.metrics import StageTimings
+from products.recommendations import generate_suggestions
+from products.review_search import optimize_review_index, rebuild_review_index, suspend_review_indexing
+from products.rollups import RollupDelta, rebuild_rollups
+from products.models import DatasetLoad, Product, Sale, Review, Return, ReturnReason, SuggestedAction
+from datetime import datetime
+from functools import partial
 import os
+import time
 
 
 class Command(BaseCommand):
     """
     Custom Django command that clears existing product data and reloads
     fresh information directly from the provided JSON dataset.
-    This version intentionally avoids any CSV merging or secondary data imports.
+    The dataset is streamed entry by entry and written with bulk inserts in
+    fixed-size batches, so memory stays flat regardless of the feed size.
+    With --workers N, JSON decoding and record normalisation run on a process pool
+    while this process only splits the feed into entries and remains the single
+    database writer.
+    With --incremental, only products whose record fingerprint changed are
+    rewritten and re-aggregated; manual suggestions on untouched products survive.
+    With --shadow, the load runs against a copy of the live database in a new file
+    and readers are switched to it only once it has been verified, so the dashboard
+    keeps serving the previous dataset, unblocked, for the whole reload.
+    With --format csv, the sde2_sales / sde2_reviews / sde2_returns CSV feeds are read
+    in chunks with pandas, aggregated with vectorized group-bys and bulk inserted in a
+    single transaction; product names are kept from the previous load where known.
     """
 
-    help = "Reloads product, sales, review, and return data purely from the JSON dataset."
+    help = "Reloads product, sales, review, and return data from the JSON dataset or the CSV feeds."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dataset",
+            default=os.path.join("products", "data", "sde2_merchtech_dataset.txt"),
+            help="Path to the JSON dataset to load (with --format csv: the directory holding the CSV feeds).",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("json", "csv"),
+            default="json",
+            help="Source format: the JSON dataset (default) or the sde2_*.csv feeds.",
+        )
+        parser.add_argument(
+            "--chunk-rows",
+            type=int,
+            default=100_000,
+            help="CSV rows parsed and inserted per chunk with --format csv (default: 100000).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of product records written per transaction (default: 500).",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only upsert, delete and re-aggregate products whose record changed since the last load.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes used to normalise records, sharded by ASIN; the database is still written by one process.",
+        )
+        parser.add_argument(
+            "--shadow",
+            action="store_true",
+            help="Build the load in a new SQLite file and atomically switch readers to it once verified.",
+        )
 
     def handle(self, *args, **kwargs):
-        base_path = "products/data"
-        dataset_path = os.path.join(base_path, "sde2_merchtech_dataset.txt")
+        dataset_path = kwargs["dataset"]
+        batch_size = kwargs["batch_size"]
+        incremental = kwargs["incremental"]
+        workers = kwargs["workers"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        if workers < 1:
+            raise CommandError("--workers must be a positive integer.")
+        if kwargs["chunk_rows"] < 1:
+            raise CommandError("--chunk-rows must be a positive integer.")
 
+        if not os.path.exists(dataset_path):
+            self.stdout.write(self.style.ERROR(f"❌ Dataset not found at: {dataset_path}"))
+            return
+
+        timings = StageTimings("load_kpis")
+        if kwargs["format"] == "csv":
+            if incremental or workers > 1:
+                raise CommandError("--incremental and --workers only apply to the JSON dataset.")
+            # The default --dataset points at the JSON file; its directory holds the CSV feeds
+            directory = dataset_path if os.path.isdir(dataset_path) else os.path.dirname(dataset_path)
+            try:
+                paths = feed_paths(directory)
+            except FileNotFoundError as exc:
+                self.stdout.write(self.style.ERROR(f"❌ {exc}"))
+                return
+            load_dataset = partial(self._load_csv, paths, kwargs["chunk_rows"], timings)
+        else:
+            load_dataset = partial(self._load, dataset_path, batch_size, incremental, workers, timings)
+
+        if not kwargs["shadow"]:
+            load_dataset()
+            self.stdout.write(f"⏱️ Stage timings: {timings.summary()}")
+            return
+
+        if connection.vendor != "sqlite":
+            raise CommandError("--shadow is only supported for SQLite databases.")
+        if connection.in_atomic_block:
+            raise CommandError("--shadow cannot copy the live database from inside a transaction.")
+        with timings.stage("copy"):
+            shadow_path = shadow.create_shadow()
+        self.stdout.write(f"🪞 Building the new dataset in {shadow_path.name}...")
+        try:
+            with shadow.use_database(shadow_path, shadow.SHADOW_PRAGMAS):
+                call_command("migrate", verbosity=0)
+                load = load_dataset()
+                with timings.stage("verify"):
+                    shadow.verify_shadow(load.product_count)
+                    shadow.finalize_shadow()
+        except BaseException:
+            shadow.discard(shadow_path)
+            self.stdout.write(self.style.ERROR("❌ Shadow load failed; the live database was left untouched."))
+            raise
+        shadow.activate(shadow_path)
+        self.stdout.write(self.style.SUCCESS(f"🔀 Readers switched to {shadow_path.name}."))
+        self.stdout.write(f"⏱️ Stage timings: {timings.summary()}")
+
+    def _load(self, dataset_path, batch_size, incremental, workers, timings):
+        """Run the load against the current default database and return its DatasetLoad."""
         # -------------------------------------------------------------
         # STEP 1: Clean all old records before reloading
+        # (incremental mode keeps them and compares fingerprints instead)
+        # -------------------------------------------------------------
+        if incremental:
+            with timings.stage("clear"):
+                known = dict(Product.objects.values_list("asin", "fingerprint"))
+            rollup_delta = RollupDelta()
+            self.stdout.write(f"🔎 Incremental load against {len(known)} existing products.")
+        else:
+            known = rollup_delta = None
+            self.stdout.write("🧹 Removing old records...")
+            with timings.stage("clear"), transaction.atomic():
+                Sale.objects.all().delete()
+                Review.objects.all().delete()
+                Return.objects.all().delete()
+                SuggestedAction.objects.all().delete()
+                Product.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS("✅ Old data successfully cleared."))
+
+        # -------------------------------------------------------------
+        # STEP 2: Stream dataset from JSON in fixed-size batches
+        # -------------------------------------------------------------
+        started = time.monotonic()
+        product_count = row_count = 0
+        seen_asins = set()
+        changed_asins = []
+
+        header = {}
+        record_batches = iter_record_batches(dataset_path, batch_size, workers, header)
+        for batch in timings.iterate("parse", record_batches):
+            records = self._skip_missing_asins(batch)
+            seen_asins.update(record["asin"] for record in records)
+            if known is not None:
+                records = [r for r in records if known.get(r["asin"]) != r["fingerprint"]]
+
+            with timings.stage("insert"):
+                written_rows = self._write_batch(records, known, rollup_delta)
+            changed_asins.extend(record["asin"] for record in records)
+            product_count += len(records)
+            row_count += written_rows
+            self._report_progress(product_count, row_count, started)
+
+        if known is not None:
+            removed_asins = [asin for asin in known if asin not in seen_asins]
+            for chunk in iter_batches(removed_asins, batch_size):
+                with timings.stage("insert"), transaction.atomic():
+                    removed = Product.objects.filter(asin__in=chunk)
+                    rollup_delta.subtract_products(list(removed.values_list("id", flat=True)))
+                    removed.delete()
+            self.stdout.write(
+                f"📦 {product_count} new or changed products, "
+                f"{len(seen_asins) - product_count} unchanged, {len(removed_asins)} removed."
+            )
+        else:
+            self.stdout.write(f"📦 Imported {product_count} product records.")
+        self.stdout.write(self.style.SUCCESS("✅ Dataset successfully loaded from JSON."))
+
+        # -------------------------------------------------------------
+        # STEP 3: Recalculate product-level metrics and dashboard rollups
+        # -------------------------------------------------------------
+        with timings.stage("aggregate"):
+            refresh_product_aggregates(changed_asins if incremental else None)
+            if rollup_delta is not None:
+                rollup_delta.apply()
+            else:
+                rebuild_rollups()
+            # Reviews reach the full-text index through triggers; compact what this load wrote
+            optimize_review_index()
+        self.stdout.write(self.style.SUCCESS("✅ Product aggregates and rollups updated."))
+
+        return self._finish(timings, changed_asins if incremental else None, header, len(seen_asins), incremental)
+
+    def _load_csv(self, paths, chunk_rows, timings):
+        """Run a full load of the CSV feeds against the current default database and return its DatasetLoad."""
+        # -------------------------------------------------------------
+        # STEP 1: Clean all old records, keeping product names
+        # (the CSV feeds carry none)
         # -------------------------------------------------------------
         self.stdout.write("🧹 Removing old records...")
-        with transaction.atomic():
+        with timings.stage("clear"), transaction.atomic():
+            names = dict(Product.objects.values_list("asin", "name"))
             Sale.objects.all().delete()
             Review.objects.all().delete()
             Return.objects.all().delete()
@@ -33,161 +228,160 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("✅ Old data successfully cleared."))
 
         # -------------------------------------------------------------
-        # STEP 2: Load dataset from JSON
+        # STEP 2: Stream the CSV feeds in chunks, aggregating as we go
         # -------------------------------------------------------------
-        if not os.path.exists(dataset_path):
-            self.stdout.write(self.style.ERROR(f"❌ Dataset not found at: {dataset_path}"))
-            return
+        started = time.monotonic()
+        with timings.stage("parse"):
+            asins = collect_asins(paths, chunk_rows)
+        row_count = skipped = 0
+        # One transaction: rows reference products that are only inserted at the end
+        with transaction.atomic():
+            suspend_review_indexing()
+            load = CsvLoad(asins, next_product_id())
+            writers = {"sales": load.write_sales, "reviews": load.write_reviews, "returns": load.add_returns}
+            for feed, write in writers.items():
+                for chunk, missing in timings.iterate("parse", read_feed(paths[feed], feed, chunk_rows)):
+                    skipped += missing
+                    with timings.stage("insert"):
+                        row_count += write(chunk)
+                    self._report_progress(len(asins), row_count, started)
+            with timings.stage("insert"):
+                load.write_returns()
+                load.sum_sales()
+                load.write_products(names)
+            with timings.stage("aggregate"):
+                rebuild_review_index()
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️ Skipped {skipped} CSV rows with missing ASIN."))
+        self.stdout.write(f"📦 Imported {len(asins)} products from {row_count} CSV rows.")
+        self.stdout.write(self.style.SUCCESS("✅ Dataset successfully loaded from CSV."))
+
+        # -------------------------------------------------------------
+        # STEP 3: Rebuild dashboard rollups (product totals and the review
+        # search index were already written inside the load transaction)
+        # -------------------------------------------------------------
+        with timings.stage("aggregate"):
+            rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS("✅ Product aggregates and rollups updated."))
 
-        with open(dataset_path, "r") as file:
-            dataset = json.load(file)
+        modified = max(os.path.getmtime(path) for path in paths.values())
+        header = {"version": "csv", "generated_at": datetime.fromtimestamp(modified).isoformat(timespec="seconds")}
+        return self._finish(timings, None, header, len(asins))
 
-        product_entries = dataset.get("products", [])
-        self.stdout.write(f"📦 Found {len(product_entries)} product records to import.")
+    def _finish(self, timings, changed_asins, header, product_count, incremental=False):
+        """Steps shared by both formats once the data and rollups are in place."""
+        # -------------------------------------------------------------
+        # STEP 4: Generate automatic improvement suggestions
+        # -------------------------------------------------------------
+        with timings.stage("recommend"):
+            summary = generate_suggestions(changed_asins)
+        self.stdout.write(
+            f"🧠 {summary['created'] + summary['updated']} suggestions written, "
+            f"{summary['skipped']} manual suggestions kept."
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Insights generated successfully."))
 
-        for item in product_entries:
-            asin = str(item.get("asin", "")).strip()
-            if not asin:
+        # -------------------------------------------------------------
+        # STEP 5: Bump the dataset version so cached dashboards are invalidated
+        # -------------------------------------------------------------
+        load = DatasetLoad.objects.create(
+            source_version=str(header.get("version", "")),
+            generated_at=str(header.get("generated_at", "")),
+            incremental=incremental,
+            product_count=product_count,
+        )
+        self.stdout.write(self.style.SUCCESS(f"🔖 Dataset version {load.pk} recorded."))
+        return load
+
+    # -----------------------------------------------------------------
+    # INTERNAL METHODS: Batch Loading
+    # -----------------------------------------------------------------
+    def _skip_missing_asins(self, batch):
+        records = []
+        for record in batch:
+            if record is None:
                 self.stdout.write(self.style.WARNING("⚠️ Skipped record with missing ASIN."))
                 continue
+            records.append(record)
+        return records
 
-            # Create product entry
-            product = Product.objects.create(
-                asin=asin,
-                name=item.get("product", "Unnamed Product")
-            )
-
-            # ---------------- Sales Data ----------------
-            for sale in item.get("sales", []):
-                Sale.objects.update_or_create(
-                    product=product,
-                    week=sale["week"],
-                    defaults={
-                        "units_sold": sale["units_sold"],
-                        "gmv": sale["gmv"],
-                        "refunds": sale["refunds"],
-                    },
-                )
+    def _write_batch(self, records, known=None, rollup_delta=None):
+        """
+        Bulk-insert one batch of normalised records in a single transaction.
+        ASINs already present in ``known`` are replaced in place: their sales, reviews,
+        returns and suggestion are dropped and rebuilt, and the change is recorded in
+        ``rollup_delta`` when given. Returns the number of rows written.
+        """
+        if not records:
+            return 0
 
-            # ---------------- Review Data ----------------
-            for review in item.get("reviews", []):
-                Review.objects.create(
-                    product=product,
-                    review_text=review.get("review_text", "").strip(),
-                    rating=review.get("rating", 0),
-                )
+        with transaction.atomic():
+            existing = {}
+            if known:
+                existing = {
+                    p.asin: p for p in Product.objects.filter(
+                        asin__in=[r["asin"] for r in records if r["asin"] in known]
+                    )
+                }
+            if existing:
+                stale_ids = [p.pk for p in existing.values()]
+                if rollup_delta is not None:
+                    rollup_delta.subtract_products(stale_ids)
+                Sale.objects.filter(product_id__in=stale_ids).delete()
+                Review.objects.filter(product_id__in=stale_ids).delete()
+                Return.objects.filter(product_id__in=stale_ids).delete()
+                SuggestedAction.objects.filter(product_id__in=stale_ids).delete()
+                for record in records:
+                    product = existing.get(record["asin"])
+                    if product is not None:
+                        product.name = record["name"]
+                        product.fingerprint = record["fingerprint"]
+                Product.objects.bulk_update(existing.values(), ["name", "fingerprint"])
 
-            # ---------------- Return Data ----------------
-            # Combine duplicate return reasons and sum their counts
-            merged_reasons = {}
-            for ret in item.get("returns", []):
-                reason = ret.get("return_reason", "").strip()
-                count = int(ret.get("count", 0))
-                if reason:
-                    merged_reasons[reason] = merged_reasons.get(reason, 0) + count
-
-            for reason, total_count in merged_reasons.items():
-                Return.objects.create(
-                    product=product,
-                    return_reason=reason,
-                    count=total_count,
+            created = Product.objects.bulk_create([
+                Product(asin=record["asin"], name=record["name"], fingerprint=record["fingerprint"])
+                for record in records if record["asin"] not in existing
+            ])
+            if created and created[0].pk is None:
+                # Backends without RETURNING support: resolve ids with one lookup.
+                ids = dict(
+                    Product.objects.filter(asin__in=[p.asin for p in created]).values_list("asin", "id")
                 )
+                for product in created:
+                    product.pk = ids[product.asin]
 
-        self.stdout.write(self.style.SUCCESS("✅ Dataset successfully loaded from JSON."))
+            by_asin = {**existing, **{p.asin: p for p in created}}
+            products = [by_asin[record["asin"]] for record in records]
 
-        # -------------------------------------------------------------
-        # STEP 3: Recalculate product-level metrics
-        # -------------------------------------------------------------
-        for product in Product.objects.all():
-            sales_qs = Sale.objects.filter(product=product)
-            reviews_qs = Review.objects.filter(product=product)
-            returns_qs = Return.objects.filter(product=product)
-
-            product.total_gmv = sales_qs.aggregate(total=Sum("gmv"))["total"] or 0
-            product.total_units = sales_qs.aggregate(total=Sum("units_sold"))["total"] or 0
-            product.total_refunds = sales_qs.aggregate(total=Sum("refunds"))["total"] or 0
-            product.average_rating = (
-                round(sum(r.rating for r in reviews_qs) / len(reviews_qs), 2)
-                if reviews_qs else 0
+            reason_ids = ReturnReason.objects.intern(
+                reason for record in records for reason, _ in record["returns"]
             )
-            product.save()
-
-        self.stdout.write(self.style.SUCCESS("✅ Product aggregates updated."))
+            sales, reviews, returns = [], [], []
+            for product, record in zip(products, records):
+                sales.extend(
+                    Sale(product_id=product.pk, week=week, units_sold=units, gmv=gmv, refunds=refunds)
+                    for week, units, gmv, refunds in record["sales"]
+                )
+                reviews.extend(
+                    Review(product_id=product.pk, review_text=text, rating=rating)
+                    for text, rating in record["reviews"]
+                )
+                returns.extend(
+                    Return(product_id=product.pk, reason_id=reason_ids[reason], count=count)
+                    for reason, count in record["returns"]
+                )
 
-        # -------------------------------------------------------------
-        # STEP 4: Generate automatic improvement suggestions
-        # -------------------------------------------------------------
-        for product in Product.objects.all():
-            suggestion_text = self._generate_recommendations(product)
-            self.stdout.write(f"🧠 {product.name}: {suggestion_text}")
+            Sale.objects.bulk_create(sales)
+            Review.objects.bulk_create(reviews)
+            Return.objects.bulk_create(returns)
+            if rollup_delta is not None:
+                rollup_delta.add_records(records)
 
-        self.stdout.write(self.style.SUCCESS("✅ Insights generated successfully."))
+        return len(products) + len(sales) + len(reviews) + len(returns)
 
-    # -----------------------------------------------------------------
-    # INTERNAL METHOD: Suggestion Generation
-    # -----------------------------------------------------------------
-    def _generate_recommendations(self, product):
-        """Create meaningful suggestions for a product based on its feedback, returns, and ratings."""
-        reviews = Review.objects.filter(product=product)
-        returns = Return.objects.filter(product=product)
-        avg_rating = product.average_rating or 0
-        combined_reviews = " ".join([r.review_text.lower() for r in reviews])
-        return_reasons = list(returns.values_list("return_reason", flat=True))
-
-        recommendations = set()
-
-        # Common issues mapped to corrective actions
-        issue_map = {
-            "late delivery": "Optimize supply chain and partner logistics to improve on-time delivery.",
-            "defective product": "Perform tighter quality control during manufacturing and pre-shipment inspections.",
-            "damaged item": "Enhance packaging standards and review warehouse handling procedures.",
-            "wrong color": "Audit image-to-product color accuracy and improve product detail page descriptions.",
-            "size mismatch": "Update sizing guides and improve dimensional accuracy in listings.",
-            "delayed shipment": "Work closely with carriers to improve dispatch and reduce delay rates.",
-            "poor quality": "Reassess supplier quality standards and perform regular QA audits."
-       }
-
-        # Link known issues to corresponding actions
-        for reason in return_reasons:
-            for keyword, action in issue_map.items():
-                if keyword in reason.lower():
-                    recommendations.add(action)
-
-        # Sentiment-based logic (keywords from reviews)
-        if "defect" in combined_reviews or "broken" in combined_reviews:
-            recommendations.add("Strengthen pre-shipment inspection and product testing.")
-        if "damage" in combined_reviews:
-            recommendations.add("Introduce protective packaging for vulnerable components.")
-        if "late" in combined_reviews or "delay" in combined_reviews:
-            recommendations.add("Work with faster, more reliable couriers to reduce delays.")
-        if "wrong" in combined_reviews or "mismatch" in combined_reviews:
-            recommendations.add("Validate product details before dispatch to avoid mismatched shipments.")
-        if "size" in combined_reviews:
-            recommendations.add("Provide clearer sizing information to minimize fit-related returns.")
-
-        # Additional suggestions based on overall rating trends
-        if avg_rating < 2.5:
-            recommendations.add("Immediate review required — identify top customer pain points.")
-        elif 2.5 <= avg_rating < 3.5:
-            recommendations.add("Moderate satisfaction — address frequent feedback topics to boost ratings.")
-        elif avg_rating >= 4.5:
-            recommendations.add("High performer — continue promotion and maintain consistency.")
-
-        # Select top few actionable insights
-        if recommendations:
-            suggestion_text = " ".join(list(recommendations)[:3])
-        else:
-            suggestion_text = "Product is performing well — continue monitoring feedback and logistics KPIs."
-
-        # Store or update suggestion record
-        SuggestedAction.objects.update_or_create(
-            product=product,
-            defaults={
-                "action_text": suggestion_text,
-                "is_manual": False,
-                "generated_on": timezone.now(),
-            },
+    def _report_progress(self, product_count, row_count, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"⏱️ {product_count} products / {row_count} rows written "
+            f"({row_count / elapsed:,.0f} rows/sec)"
         )
-
-        return suggestion_text
-    
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+# Cold mode disables every cache so each request evaluates all dashboard blocks
+COLD_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "dashboard": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+class Command(BaseCommand):
+    """
+    Compares dashboard throughput and latency through Django's WSGI (sync view on a
+    thread pool) and ASGI (async view on an event loop) request handlers, in process,
+    against the currently loaded dataset. Both sides get the same concurrency, so the
+    difference comes from the view and handler stack rather than from a web server.
+    """
+
+    help = "Load-tests the sync (WSGI) and async (ASGI) dashboard views and prints throughput and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=40, help="Requests per handler (default: 40).")
+        parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight (default: 4).")
+        parser.add_argument("--query", default="", help="Dashboard query string, e.g. 'rating=low'.")
+        parser.add_argument("--warm", action="store_true", help="Keep the dashboard caches enabled.")
+        parser.add_argument("--wsgi-path", default="/", help="Sync dashboard path (default: /).")
+        parser.add_argument("--asgi-path", default="/async/", help="Async dashboard path (default: /async/).")
+
+    def handle(self, *args, **kwargs):
+        if kwargs["requests"] < 1 or kwargs["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive integers.")
+        query = f"?{kwargs['query']}" if kwargs["query"] else ""
+        mode = "warm" if kwargs["warm"] else "cold"
+        self.stdout.write(
+            f"🚦 {kwargs['requests']} requests per handler, {kwargs['concurrency']} concurrent, {mode} cache."
+        )
+
+        settings_override = override_settings() if kwargs["warm"] else override_settings(CACHES=COLD_CACHES)
+        setup_test_environment()  # lets the test clients' host through ALLOWED_HOSTS
+        try:
+            with settings_override:
+                results = [
+                    ("WSGI", self._run_wsgi(kwargs["wsgi_path"] + query, kwargs["requests"], kwargs["concurrency"])),
+                    ("ASGI", asyncio.run(
+                        self._run_asgi(kwargs["asgi_path"] + query, kwargs["requests"], kwargs["concurrency"])
+                    )),
+                ]
+        finally:
+            teardown_test_environment()
+
+        for name, (elapsed, latencies) in results:
+            latencies.sort()
+            self.stdout.write(
+                f"📊 {name}: {len(latencies) / elapsed:,.2f} req/s | "
+                f"p50 {_percentile(latencies, 50) * 1000:,.0f} ms, "
+                f"p95 {_percentile(latencies, 95) * 1000:,.0f} ms, "
+                f"max {latencies[-1] * 1000:,.0f} ms, mean {statistics.fmean(latencies) * 1000:,.0f} ms"
+            )
+
+    def _run_wsgi(self, url, requests, concurrency):
+        def fetch(_):
+            started = time.perf_counter()
+            response = Client().get(url)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned HTTP {response.status_code}")
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(fetch, range(requests)))
+        return time.perf_counter() - started, latencies
+
+    async def _run_asgi(self, url, requests, concurrency):
+        gate = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def fetch():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned HTTP {response.status_code}")
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch() for _ in range(requests)))
+        return time.perf_counter() - started, list(latencies)
+
+
+def _percentile(ordered, percent):
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
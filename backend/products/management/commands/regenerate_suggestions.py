@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from products.recommendations import generate_suggestions
+
+
+class Command(BaseCommand):
+    """
+    Re-runs the recommendation engine over the data already in the database,
+    without reloading the dataset. Manual suggestions are left untouched.
+    """
+
+    help = "Regenerates automatic suggested actions for all products (or the given ASINs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--asin",
+            action="append",
+            dest="asins",
+            help="Only regenerate suggestions for this ASIN (repeatable).",
+        )
+
+    def handle(self, *args, **kwargs):
+        summary = generate_suggestions(kwargs["asins"])
+        self.stdout.write(
+            f"🧠 {summary['created']} created, {summary['updated']} updated, "
+            f"{summary['skipped']} manual suggestions kept."
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Insights generated successfully."))
@@ -0,0 +1,217 @@
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from itertools import product
+from urllib.parse import urlencode
+
+import django
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from products.cache import DASHBOARD_CACHE_ALIAS
+from products.datagen import RETURN_REASONS, write_dataset
+from products.models import Product
+
+# Benchmarks never touch the configured caches or report directory
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark-default"},
+    DASHBOARD_CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"},
+}
+RATINGS = ("", "low", "mid", "high")
+
+
+class QueryCounter:
+    """Database execute wrapper that only counts statements (no SQL is kept in memory)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """
+    End-to-end performance suite. Loads a synthetic (or given) dataset into a throwaway
+    test database and times load_kpis, the dashboard for every filter combination (cold
+    and warm cache), the chart data endpoints and the CSV / XLSX / PDF exports. Each
+    case records wall time, query count and peak Python memory, and the run is written
+    to a JSON file so results can be compared across commits (see --compare).
+    """
+
+    help = "Runs the end-to-end performance benchmarks and writes the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dataset", help="Benchmark an existing JSON dataset instead of generating one.")
+        parser.add_argument("--products", type=int, default=5000, help="Generated products (default: 5000).")
+        parser.add_argument("--weeks", type=int, default=12, help="Generated weeks per product (default: 12).")
+        parser.add_argument("--reviews", type=int, default=5, help="Average generated reviews (default: 5).")
+        parser.add_argument("--returns", type=int, default=3, help="Average generated returns (default: 3).")
+        parser.add_argument("--seed", type=int, default=42, help="Generator seed (default: 42).")
+        parser.add_argument(
+            "--output",
+            help="Result file (default: benchmarks/<timestamp>.json).",
+        )
+        parser.add_argument("--compare", help="Earlier result file to print deltas against.")
+        parser.add_argument(
+            "--skip-memory",
+            action="store_true",
+            help="Skip the second, tracemalloc-instrumented run of every case.",
+        )
+        parser.add_argument("--skip-pdf", action="store_true", help="Leave out the (slow) PDF export.")
+
+    def handle(self, *args, **kwargs):
+        if kwargs["products"] < 1:
+            raise CommandError("--products must be a positive integer.")
+        self.track_memory = not kwargs["skip_memory"]
+        self.skip_pdf = kwargs["skip_pdf"]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            # ---- STEP 1: Dataset ----
+            dataset = kwargs["dataset"]
+            if dataset:
+                if not os.path.exists(dataset):
+                    raise CommandError(f"Dataset not found at: {dataset}")
+                dataset_info = {"path": dataset}
+            else:
+                dataset = os.path.join(workdir, "dataset.json")
+                dataset_info = {key: kwargs[key] for key in ("products", "weeks", "reviews", "returns", "seed")}
+                with open(dataset, "w", encoding="utf-8") as stream:
+                    write_dataset(stream, kwargs["products"], kwargs["weeks"], kwargs["reviews"],
+                                  kwargs["returns"], kwargs["seed"])
+                self.stdout.write(f"🧪 Generated {kwargs['products']} synthetic products.")
+
+            # ---- STEP 2: Throwaway database ----
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with override_settings(CACHES=BENCHMARK_CACHES, REPORTS_ROOT=workdir):
+                    products_loaded, results = self._run_cases(dataset)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        # ---- STEP 3: Results ----
+        dataset_info["products_loaded"] = products_loaded
+        report = {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "dataset": dataset_info,
+            "results": results,
+        }
+        output = kwargs["output"] or os.path.join("benchmarks", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+
+        baseline = {}
+        if kwargs["compare"]:
+            with open(kwargs["compare"], encoding="utf-8") as stream:
+                baseline = {case["name"]: case for case in json.load(stream)["results"]}
+        self._print_results(results, baseline)
+        self.stdout.write(self.style.SUCCESS(f"✅ Results written to {output}"))
+
+    def _run_cases(self, dataset):
+        """Run every case and return ``(loaded product count, results)``."""
+        client = Client()
+        results = []
+
+        def load():
+            call_command("load_kpis", dataset=dataset, stdout=io.StringIO())
+
+        results.append(self._measure("load_kpis", load))
+        products_loaded = Product.objects.count()
+        self.stdout.write(f"📦 Loaded {products_loaded} products.")
+
+        def fetch(url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned HTTP {response.status_code}")
+            # Streaming responses only do their work while being consumed
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            else:
+                response.content
+
+        def cold(url):
+            caches[DASHBOARD_CACHE_ALIAS].clear()
+            fetch(url)
+
+        first_asin = Product.objects.order_by("id").values_list("asin", flat=True).first() or ""
+        dashboard = reverse("product_dashboard")
+        for asin, issue, rating in product(("", first_asin), ("", RETURN_REASONS[0]), RATINGS):
+            query = urlencode({
+                key: value for key, value in (("product", asin), ("issue", issue), ("rating", rating)) if value
+            })
+            url = f"{dashboard}?{query}"
+            label = f"dashboard[{query or 'all'}]"
+            results.append(self._measure(f"{label} cold", lambda: cold(url)))
+            results.append(self._measure(f"{label} warm", lambda: fetch(url)))
+
+        for name in ("gmv_chart", "reason_chart"):
+            url = reverse(name)
+            results.append(self._measure(f"{name} cold", lambda: cold(url)))
+            results.append(self._measure(f"{name} warm", lambda: fetch(url)))
+
+        exports = ["export_csv", "export_xlsx"] + ([] if self.skip_pdf else ["export_pdf"])
+        for name in exports:
+            results.append(self._measure(name, lambda: fetch(reverse(name))))
+
+        return products_loaded, results
+
+    def _measure(self, name, func):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+        result = {"name": name, "seconds": round(seconds, 4), "queries": counter.count}
+
+        if self.track_memory:
+            # Separate run so tracing overhead never inflates the timing above
+            tracemalloc.start()
+            try:
+                func()
+                result["peak_memory_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+            finally:
+                tracemalloc.stop()
+
+        self.stdout.write(f"⏱️ {name}: {seconds * 1000:,.1f} ms, {counter.count} queries")
+        return result
+
+    def _print_results(self, results, baseline):
+        self.stdout.write("\n📊 Summary:")
+        width = max(len(case["name"]) for case in results)
+        for case in results:
+            line = f"   {case['name']:<{width}} {case['seconds'] * 1000:>10,.1f} ms {case['queries']:>6} q"
+            if "peak_memory_kib" in case:
+                line += f" {case['peak_memory_kib']:>9,} KiB"
+            previous = baseline.get(case["name"])
+            if previous and previous["seconds"]:
+                line += f"  ({(case['seconds'] / previous['seconds'] - 1) * 100:+.0f}% time"
+                line += f", {case['queries'] - previous['queries']:+d} q)"
+            self.stdout.write(line)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,301 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .cache import dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+INF_BUCKET = 'le="+Inf"'
+
+# Stats of the request being served in the current thread / task (None outside requests)
+_current_request = ContextVar("metrics_request", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, INF_BUCKET)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+# Process-local metrics; each server worker process exposes its own values
+REQUESTS = Counter("merchtech_requests_total", "HTTP requests served.", ("view", "method", "status"))
+REQUEST_DURATION = Histogram(
+    "merchtech_request_duration_seconds", "Request latency, including streamed bodies.", ("view",)
+)
+REQUEST_QUERIES = Histogram(
+    "merchtech_request_sql_queries", "SQL statements executed per request.", ("view",), QUERY_BUCKETS
+)
+REQUEST_SQL_DURATION = Histogram(
+    "merchtech_request_sql_duration_seconds", "Total SQL time per request.", ("view",)
+)
+SECTION_DURATION = Histogram(
+    "merchtech_section_duration_seconds", "Time spent in named hot sections.", ("section",)
+)
+METRICS = (REQUESTS, REQUEST_DURATION, REQUEST_QUERIES, REQUEST_SQL_DURATION, SECTION_DURATION)
+
+
+class RequestStats:
+    """
+    One request's SQL count and time (grouped by statement) plus the time spent in each
+    :func:`timed_section`. Thread-safe, as dashboard blocks may run on worker threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = {}
+        self.sections = {}
+        self._lock = threading.Lock()
+
+    def record_query(self, sql, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += elapsed
+            calls, total = self.statements.get(sql, (0, 0.0))
+            self.statements[sql] = (calls + 1, total + elapsed)
+
+    def record_section(self, name, elapsed):
+        with self._lock:
+            self.sections[name] = self.sections.get(name, 0.0) + elapsed
+
+
+def _record_query(execute, sql, params, many, context):
+    """Execute wrapper on every connection; charges statements to the request in the current context."""
+    stats = _current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver (connected in ProductsConfig.ready)."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def timed_section(name):
+    """Time a named hot section; recorded globally and against the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SECTION_DURATION.observe((name,), elapsed)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record_section(name, elapsed)
+
+
+class StageTimings:
+    """Accumulates the total time of each stage of a batch job such as load_kpis."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.totals = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            with timed_section(f"{self.prefix}.{name}"):
+                yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - started
+
+    def iterate(self, name, iterable):
+        """Yield from ``iterable``, charging the time spent producing each item to ``name``."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.totals.items())
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL count and SQL time per view. Streamed responses are measured
+    until their body has been fully sent, so export costs are attributed correctly.
+    Requests slower than ``METRICS_SLOW_REQUEST_SECONDS`` are logged with a per-statement
+    and per-section breakdown.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._stream(request, response, response.streaming_content, stats)
+        else:
+            self._record(request, response, stats)
+        return response
+
+    def _stream(self, request, response, content, stats):
+        # Each chunk may be produced in a different context (ASGI), so the stats are set per step
+        iterator = iter(content)
+        try:
+            while True:
+                token = _current_request.set(stats)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    _current_request.reset(token)
+                yield chunk
+        finally:
+            self._record(request, response, stats)
+
+    def _record(self, request, response, stats):
+        elapsed = time.perf_counter() - stats.started
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unmatched"
+
+        REQUESTS.inc((view, request.method, str(response.status_code)))
+        REQUEST_DURATION.observe((view,), elapsed)
+        REQUEST_QUERIES.observe((view,), stats.queries)
+        REQUEST_SQL_DURATION.observe((view,), stats.sql_seconds)
+
+        threshold = getattr(settings, "METRICS_SLOW_REQUEST_SECONDS", None)
+        if threshold is not None and elapsed >= threshold:
+            self._log_slow_request(request, view, elapsed, stats)
+
+    @staticmethod
+    def _log_slow_request(request, view, elapsed, stats):
+        slowest = sorted(stats.statements.items(), key=lambda item: item[1][1], reverse=True)[:5]
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} ({view}): "
+            f"{elapsed * 1000:.1f} ms, {stats.queries} queries, {stats.sql_seconds * 1000:.1f} ms SQL"
+        ]
+        lines += [f"  section {name}: {seconds * 1000:.1f} ms" for name, seconds in stats.sections.items()]
+        lines += [
+            f"  sql x{calls} {total * 1000:.1f} ms: {sql[:200]}"
+            for sql, (calls, total) in slowest
+        ]
+        logger.warning("\n".join(lines))
+
+
+def render_metrics():
+    """All metrics (plus dashboard cache hit/miss counters) in the Prometheus text format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    cache = dashboard_stats.snapshot()
+    for outcome in ("hits", "misses"):
+        name = f"merchtech_dashboard_cache_{outcome}_total"
+        lines += [f"# HELP {name} Dashboard cache {outcome}.", f"# TYPE {name} counter", f"{name} {cache[outcome]}"]
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, only served to the addresses in ``METRICS_ALLOWED_IPS``."""
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", ("127.0.0.1", "::1"))
+    if request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponseForbidden("Metrics are only available locally.")
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
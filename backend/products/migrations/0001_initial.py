@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asin', models.CharField(max_length=50, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('average_rating', models.FloatField(default=0)),
+                ('total_gmv', models.FloatField(default=0)),
+                ('total_units', models.IntegerField(default=0)),
+                ('total_refunds', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Return',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('return_reason', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_text', models.TextField()),
+                ('rating', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SuggestedAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_text', models.TextField()),
+                ('generated_on', models.DateTimeField(auto_now=True)),
+                ('is_manual', models.BooleanField(default=False)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suggested_action_entry', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.CharField(max_length=20)),
+                ('units_sold', models.IntegerField()),
+                ('gmv', models.FloatField()),
+                ('refunds', models.FloatField(default=0.0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+            options={
+                'unique_together': {('product', 'week')},
+            },
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:23
+
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    """Fill the new product rollups and dashboard totals from rows loaded before they existed."""
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+    Return = apps.get_model("products", "Return")
+    Sale = apps.get_model("products", "Sale")
+    WeeklyTotal = apps.get_model("products", "WeeklyTotal")
+    ReturnReasonTotal = apps.get_model("products", "ReturnReasonTotal")
+
+    def per_product(model, aggregate):
+        rows = model.objects.filter(product=OuterRef("pk")).order_by().values("product")
+        return Coalesce(Subquery(rows.annotate(value=aggregate).values("value")), 0)
+
+    Product.objects.update(
+        review_count=per_product(Review, Count("id")),
+        rating_total=per_product(Review, Sum("rating")),
+        total_returns=per_product(Return, Sum("count")),
+    )
+    WeeklyTotal.objects.bulk_create(
+        WeeklyTotal(**row)
+        for row in Sale.objects.order_by().values("week").annotate(
+            gmv=Sum("gmv"), units_sold=Sum("units_sold"), refunds=Sum("refunds"), sale_count=Count("id")
+        )
+    )
+    ReturnReasonTotal.objects.bulk_create(
+        ReturnReasonTotal(**row)
+        for row in Return.objects.order_by().values("return_reason").annotate(
+            total=Sum("count"), product_count=Count("product", distinct=True)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    Tables and product columns added after the original schema: incremental-load
+    fingerprints, review/return rollups, dashboard totals, dataset versions and report jobs.
+    """
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_version', models.CharField(blank=True, default='', max_length=50)),
+                ('generated_at', models.CharField(blank=True, default='', max_length=50)),
+                ('loaded_at', models.DateTimeField(auto_now_add=True)),
+                ('incremental', models.BooleanField(default=False)),
+                ('product_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=10)),
+                ('filters', models.JSONField(default=dict)),
+                ('dataset_version', models.IntegerField(default=0)),
+                ('cache_key', models.CharField(db_index=True, max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('file_path', models.CharField(blank=True, default='', max_length=500)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReturnReasonTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('return_reason', models.CharField(max_length=255, unique=True)),
+                ('total', models.IntegerField(default=0)),
+                ('product_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WeeklyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.CharField(max_length=20, unique=True)),
+                ('gmv', models.FloatField(default=0)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('refunds', models.FloatField(default=0)),
+                ('sale_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_returns',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,164 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    """Intern return reasons into ReturnReason and convert text weeks to integers."""
+    ReturnReason = apps.get_model("products", "ReturnReason")
+    Return = apps.get_model("products", "Return")
+    ReturnReasonTotal = apps.get_model("products", "ReturnReasonTotal")
+    Sale = apps.get_model("products", "Sale")
+    WeeklyTotal = apps.get_model("products", "WeeklyTotal")
+
+    names = set(Return.objects.values_list("return_reason", flat=True).distinct())
+    names |= set(ReturnReasonTotal.objects.values_list("return_reason", flat=True))
+    ReturnReason.objects.bulk_create([ReturnReason(name=name) for name in sorted(names)])
+    for reason_id, name in ReturnReason.objects.values_list("id", "name"):
+        Return.objects.filter(return_reason=name).update(reason_id=reason_id)
+        ReturnReasonTotal.objects.filter(return_reason=name).update(reason_id=reason_id)
+
+    for model in (Sale, WeeklyTotal):
+        for week in model.objects.values_list("week", flat=True).distinct():
+            model.objects.filter(week=week).update(week_number=int(week))
+
+
+def backwards(apps, schema_editor):
+    ReturnReason = apps.get_model("products", "ReturnReason")
+    Return = apps.get_model("products", "Return")
+    ReturnReasonTotal = apps.get_model("products", "ReturnReasonTotal")
+    Sale = apps.get_model("products", "Sale")
+    WeeklyTotal = apps.get_model("products", "WeeklyTotal")
+
+    for reason_id, name in ReturnReason.objects.values_list("id", "name"):
+        Return.objects.filter(reason_id=reason_id).update(return_reason=name)
+        ReturnReasonTotal.objects.filter(reason_id=reason_id).update(return_reason=name)
+
+    for model in (Sale, WeeklyTotal):
+        for week in model.objects.values_list("week_number", flat=True).distinct():
+            model.objects.filter(week_number=week).update(week=str(week))
+
+
+class Migration(migrations.Migration):
+    """
+    Time-series friendly schema: integer weeks with a covering (product, week) index,
+    return reasons interned into a dimension table, and an index on the rating filter.
+    """
+
+    dependencies = [
+        ('products', '0002_load_state_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReturnReason',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='return',
+            name='reason',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='returns', to='products.returnreason'),
+        ),
+        migrations.AddField(
+            model_name='returnreasontotal',
+            name='reason',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='products.returnreason'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='week_number',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='weeklytotal',
+            name='week_number',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='sale',
+            unique_together=set(),
+        ),
+        # Relax the old columns before copying so that, when reversed, they are refilled before becoming required
+        migrations.AlterField(
+            model_name='return',
+            name='return_reason',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='returnreasontotal',
+            name='return_reason',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='week',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='weeklytotal',
+            name='week',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='return',
+            name='return_reason',
+        ),
+        migrations.RemoveField(
+            model_name='returnreasontotal',
+            name='return_reason',
+        ),
+        migrations.RemoveField(
+            model_name='sale',
+            name='week',
+        ),
+        migrations.RemoveField(
+            model_name='weeklytotal',
+            name='week',
+        ),
+        migrations.RenameField(
+            model_name='sale',
+            old_name='week_number',
+            new_name='week',
+        ),
+        migrations.RenameField(
+            model_name='weeklytotal',
+            old_name='week_number',
+            new_name='week',
+        ),
+        migrations.AlterField(
+            model_name='return',
+            name='reason',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='returns', to='products.returnreason'),
+        ),
+        migrations.AlterField(
+            model_name='returnreasontotal',
+            name='reason',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='products.returnreason'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='week',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='weeklytotal',
+            name='week',
+            field=models.PositiveIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='average_rating',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('product', 'week'), name='sale_product_week_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['product', 'week', 'gmv', 'units_sold'], name='sale_product_week_cover'),
+        ),
+    ]
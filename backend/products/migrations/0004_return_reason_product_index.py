@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_time_series_schema'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='return',
+            name='reason',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='returns', to='products.returnreason'),
+        ),
+        migrations.AddIndex(
+            model_name='return',
+            index=models.Index(fields=['reason', 'product'], name='return_reason_product'),
+        ),
+    ]
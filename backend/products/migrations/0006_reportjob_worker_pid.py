@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_review_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='worker_pid',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,12 +1,21 @@
+import uuid
+
 from django.db import models
 
 class Product(models.Model):
     asin = models.CharField(max_length=50, unique=True)
     name = models.CharField(max_length=255)
-    average_rating = models.FloatField(default=0)
+    # Indexed because the dashboard rating filter ranges over it on every request
+    average_rating = models.FloatField(default=0, db_index=True)
     total_gmv = models.FloatField(default=0)
     total_units = models.IntegerField(default=0)
     total_refunds = models.IntegerField(default=0)
+    # Per-product rollups so dashboard KPIs never have to scan reviews or returns
+    total_returns = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)
+    # Hash of the product's source record, used by incremental loads to skip unchanged ASINs
+    fingerprint = models.CharField(max_length=40, blank=True, default="")
 
     def __str__(self):
         return f"{self.name} ({self.asin})"
@@ -14,14 +23,20 @@ class Product(models.Model):
 
 class Sale(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    week = models.CharField(max_length=20)
+    # Integer period number, so weeks sort and range-scan numerically
+    week = models.PositiveIntegerField()
     units_sold = models.IntegerField()
     gmv = models.FloatField()
     refunds = models.FloatField(default=0.0)
 
     class Meta:
-        unique_together = ('product', 'week')
-
+        constraints = [
+            models.UniqueConstraint(fields=["product", "week"], name="sale_product_week_unique"),
+        ]
+        indexes = [
+            # Covers the per-product weekly GMV / units rollups without touching the table
+            models.Index(fields=["product", "week", "gmv", "units_sold"], name="sale_product_week_cover"),
+        ]
 
 
 class Review(models.Model):
@@ -33,13 +48,48 @@ class Review(models.Model):
         return f"{self.product.asin} - {self.rating}"
 
 
+class ReturnReasonManager(models.Manager):
+    def intern(self, names):
+        """``{name: id}`` for ``names``, creating any reasons not seen before."""
+        names = set(names)
+        if not names:
+            return {}
+        ids = dict(self.filter(name__in=names).values_list("name", "id"))
+        missing = names - ids.keys()
+        if missing:
+            self.bulk_create([ReturnReason(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(self.filter(name__in=missing).values_list("name", "id"))
+        return ids
+
+    def names(self):
+        """``{id: name}`` for every known reason; the table stays tiny, so this is one cheap query."""
+        return dict(self.values_list("id", "name"))
+
+
+class ReturnReason(models.Model):
+    """Interned return reason text; returns and rollups refer to it by integer key."""
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = ReturnReasonManager()
+
+    def __str__(self):
+        return self.name
+
+
 class Return(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    return_reason = models.CharField(max_length=255)
+    # Indexed through return_reason_product below, which also serves reason-only lookups
+    reason = models.ForeignKey(ReturnReason, on_delete=models.PROTECT, related_name="returns", db_index=False)
     count = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Inverted reason -> product index: the issue filter reads product ids straight from it
+            models.Index(fields=["reason", "product"], name="return_reason_product"),
+        ]
+
     def __str__(self):
-        return f"{self.product.asin} - {self.return_reason}"
+        return f"{self.product.asin} - {self.reason.name}"
 
 class SuggestedAction(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="suggested_action_entry")
@@ -49,3 +99,59 @@ class SuggestedAction(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - {'Manual' if self.is_manual else 'Auto'}"
+
+
+class WeeklyTotal(models.Model):
+    """Catalogue-wide sales totals for one week, maintained by load_kpis."""
+    week = models.PositiveIntegerField(unique=True)
+    gmv = models.FloatField(default=0)
+    units_sold = models.IntegerField(default=0)
+    refunds = models.FloatField(default=0)
+    sale_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Week {self.week} - {self.gmv}"
+
+
+class ReturnReasonTotal(models.Model):
+    """Catalogue-wide returned units for one return reason, maintained by load_kpis."""
+    reason = models.OneToOneField(ReturnReason, on_delete=models.CASCADE, related_name="rollup")
+    total = models.IntegerField(default=0)
+    product_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.reason.name} - {self.total}"
+
+
+class DatasetLoad(models.Model):
+    """One successful load_kpis run; the latest id is the dataset version used for caching."""
+    source_version = models.CharField(max_length=50, blank=True, default="")
+    generated_at = models.CharField(max_length=50, blank=True, default="")
+    loaded_at = models.DateTimeField(auto_now_add=True)
+    incremental = models.BooleanField(default=False)
+    product_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Load #{self.pk} ({self.source_version or 'unversioned'})"
+
+
+class ReportJob(models.Model):
+    """Background export build; finished files are reused per dataset version and filter set."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10)
+    filters = models.JSONField(default=dict)
+    dataset_version = models.IntegerField(default=0)
+    cache_key = models.CharField(max_length=255, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    file_path = models.CharField(max_length=500, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    # Process whose worker pool runs the job; an unfinished job whose process is gone is stale
+    worker_pid = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind.upper()} report {self.pk} ({self.status})"
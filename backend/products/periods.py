@@ -0,0 +1,84 @@
+from django.db.models import Sum
+
+from .models import Sale, WeeklyTotal
+
+# Comparison windows: the latest N weeks against the N weeks before them
+PERIODS = {
+    "wow": ("Week over week", 1),
+    "4w": ("Trailing 4 weeks", 4),
+    "13w": ("Quarter (13 weeks)", 13),
+}
+DEFAULT_PERIOD = "wow"
+PERIOD_METRICS = ("gmv", "units", "refunds")
+
+
+def weekly_series(products=None):
+    """
+    ``[(week, gmv, units, refunds)]`` in week order from one grouped scan: the load-time
+    WeeklyTotal rollup for the whole catalogue, or the sales of the ``products`` queryset.
+    """
+    if products is None:
+        rows = WeeklyTotal.objects.values_list("week", "gmv", "units_sold", "refunds")
+    else:
+        rows = (
+            Sale.objects.filter(product__in=products)
+            .values("week")
+            .annotate(gmv=Sum("gmv"), units=Sum("units_sold"), refunds=Sum("refunds"))
+            .values_list("week", "gmv", "units", "refunds")
+        )
+    return [(week, gmv or 0, units or 0, refunds or 0) for week, gmv, units, refunds in rows.order_by("week")]
+
+
+def pct_change(current, previous):
+    """Percentage change, or None when there is no previous value to compare against."""
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def compare_periods(series, periods=PERIODS):
+    """
+    Current-vs-previous totals and percentage changes for every window in ``periods``,
+    folded from one weekly ``series`` so adding a window costs no extra query.
+
+    Windows are anchored on the latest week: ``N`` weeks ending there against the ``N``
+    weeks before. A window is only ``comparable`` when the data reaches back far enough
+    to cover the whole previous span; otherwise its changes are None.
+    """
+    results = {}
+    if not series:
+        return {key: _empty_period(label, weeks) for key, (label, weeks) in periods.items()}
+    first, latest = series[0][0], series[-1][0]
+    for key, (label, weeks) in periods.items():
+        current = dict.fromkeys(PERIOD_METRICS, 0)
+        previous = dict.fromkeys(PERIOD_METRICS, 0)
+        for week, *values in series:
+            if week > latest - weeks:
+                bucket = current
+            elif week > latest - 2 * weeks:
+                bucket = previous
+            else:
+                continue
+            for metric, value in zip(PERIOD_METRICS, values):
+                bucket[metric] += value
+        comparable = latest - 2 * weeks + 1 >= first
+        results[key] = {
+            "label": label,
+            "weeks": weeks,
+            "comparable": comparable,
+            "current": current,
+            "previous": previous,
+            "change": {
+                metric: pct_change(current[metric], previous[metric]) if comparable else None
+                for metric in PERIOD_METRICS
+            },
+        }
+    return results
+
+
+def _empty_period(label, weeks):
+    zeros = dict.fromkeys(PERIOD_METRICS, 0)
+    return {
+        "label": label, "weeks": weeks, "comparable": False, "current": zeros, "previous": dict(zeros),
+        "change": dict.fromkeys(PERIOD_METRICS),
+    }
@@ -0,0 +1,190 @@
+import re
+
+from django.utils import timezone
+
+from .aggregates import iter_product_chunks
+from .models import Return, ReturnReason, SuggestedAction
+from .review_search import review_hits
+
+DEFAULT_SUGGESTION = "Product is performing well — continue monitoring feedback and logistics KPIs."
+MAX_SUGGESTIONS = 3
+
+# Common return issues mapped to corrective actions (matched against return reasons)
+RETURN_RULES = [
+    (("late delivery",), "Optimize supply chain and partner logistics to improve on-time delivery."),
+    (("defective product",), "Perform tighter quality control during manufacturing and pre-shipment inspections."),
+    (("damaged item",), "Enhance packaging standards and review warehouse handling procedures."),
+    (("wrong color",), "Audit image-to-product color accuracy and improve product detail page descriptions."),
+    (("size mismatch",), "Update sizing guides and improve dimensional accuracy in listings."),
+    (("delayed shipment",), "Work closely with carriers to improve dispatch and reduce delay rates."),
+    (("poor quality",), "Reassess supplier quality standards and perform regular QA audits."),
+]
+
+# Sentiment-based logic (keywords matched against review text)
+REVIEW_RULES = [
+    (("defect", "broken"), "Strengthen pre-shipment inspection and product testing."),
+    (("damage",), "Introduce protective packaging for vulnerable components."),
+    (("late", "delay"), "Work with faster, more reliable couriers to reduce delays."),
+    (("wrong", "mismatch"), "Validate product details before dispatch to avoid mismatched shipments."),
+    (("size",), "Provide clearer sizing information to minimize fit-related returns."),
+]
+
+
+def rating_suggestion(avg_rating):
+    """Suggestion based on overall rating trends, or None for the neutral band."""
+    if avg_rating < 2.5:
+        return "Immediate review required — identify top customer pain points."
+    if avg_rating < 3.5:
+        return "Moderate satisfaction — address frequent feedback topics to boost ratings."
+    if avg_rating >= 4.5:
+        return "High performer — continue promotion and maintain consistency."
+    return None
+
+
+class KeywordMatcher:
+    """Finds every keyword occurring in a text with one compiled regular expression."""
+
+    def __init__(self, keywords):
+        keywords = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+        # Zero-width lookahead so overlapping keywords at different offsets are all reported
+        self._pattern = re.compile("(?=(%s))" % "|".join(map(re.escape, keywords)))
+        # Only the longest keyword starting at an offset is captured; its prefixes match there too
+        self._implied = {k: frozenset(p for p in keywords if k.startswith(p)) for k in keywords}
+
+    def find(self, text):
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._implied[match.group(1)]
+        return found
+
+
+class RecommendationEngine:
+    """
+    Rules engine turning return reasons, reviews and ratings into suggested actions.
+
+    All rule keywords are compiled into a single matcher once. Ranking is deterministic:
+    the rating-tier suggestion leads, followed by issue actions ordered by evidence
+    (returned units for return rules, matching reviews for review rules), ties broken
+    by rule order.
+    """
+
+    def __init__(self, return_rules=RETURN_RULES, review_rules=REVIEW_RULES, limit=MAX_SUGGESTIONS):
+        self.return_rules = return_rules
+        self.review_rules = review_rules
+        self.limit = limit
+        self._return_keywords = {}
+        self._review_keywords = {}
+        for index, (keywords, _) in enumerate(return_rules):
+            for keyword in keywords:
+                self._return_keywords.setdefault(keyword, []).append(index)
+        for index, (keywords, _) in enumerate(review_rules):
+            for keyword in keywords:
+                self._review_keywords.setdefault(keyword, []).append(index)
+        self.matcher = KeywordMatcher([*self._return_keywords, *self._review_keywords])
+
+    def evaluate(self, avg_rating, returns, reviews=(), review_hits=None):
+        """
+        Build the suggestion text for one product.
+        ``returns`` is an iterable of (reason, count) and ``reviews`` of review texts.
+        ``review_hits`` maps review rule indexes to already counted matching reviews
+        (see :func:`review_rule_hits`) and can replace scanning ``reviews``.
+        """
+        evidence = {}
+
+        for reason, count in returns:
+            rules = set()
+            for keyword in self.matcher.find(reason):
+                rules.update(("return", i) for i in self._return_keywords.get(keyword, ()))
+            for rule in rules:
+                evidence[rule] = evidence.get(rule, 0) + max(count, 1)
+
+        for text in reviews:
+            rules = set()
+            for keyword in self.matcher.find(text):
+                rules.update(("review", i) for i in self._review_keywords.get(keyword, ()))
+            for rule in rules:
+                evidence[rule] = evidence.get(rule, 0) + 1
+
+        for index, count in (review_hits or {}).items():
+            if count:
+                evidence[("review", index)] = evidence.get(("review", index), 0) + count
+
+        ranked = sorted(evidence.items(), key=lambda item: (-item[1], item[0][0] != "return", item[0][1]))
+        actions = []
+        rating_action = rating_suggestion(avg_rating or 0)
+        if rating_action:
+            actions.append(rating_action)
+        for (source, index), _ in ranked:
+            rules = self.return_rules if source == "return" else self.review_rules
+            action = rules[index][1]
+            if action not in actions:
+                actions.append(action)
+
+        if not actions:
+            return DEFAULT_SUGGESTION
+        return " ".join(actions[:self.limit])
+
+
+def review_rule_hits(review_rules, products=None):
+    """
+    ``{product_id: {rule index: matching reviews}}`` for every review rule, counted by the
+    full-text index with one query per rule instead of scanning review text in Python.
+    """
+    hits = {}
+    for index, (keywords, _) in enumerate(review_rules):
+        for product_id, count in review_hits(keywords, products).items():
+            hits.setdefault(product_id, {})[index] = count
+    return hits
+
+
+def generate_suggestions(asins=None, chunk_size=2000, engine=None):
+    """
+    Evaluate every product (or only ``asins``) and store the results as SuggestedAction rows.
+
+    Review evidence is counted through the full-text index (one query per review rule):
+    once up front for the whole catalogue, or per chunk and restricted to that chunk when
+    only ``asins`` are evaluated. Each chunk then costs one query each for products,
+    returns and existing suggestions plus one upsert; reason names are looked up once.
+    Manual suggestions are never overwritten.
+    Returns a dict with created / updated / skipped counts.
+    """
+    engine = engine or RecommendationEngine()
+    reason_names = ReturnReason.objects.names()
+    review_evidence = review_rule_hits(engine.review_rules) if asins is None else None
+    summary = {"created": 0, "updated": 0, "skipped": 0}
+
+    for products in iter_product_chunks(asins, chunk_size):
+        ids = [product.pk for product in products]
+        returns = {}
+        for product_id, reason_id, count in Return.objects.filter(product_id__in=ids).values_list(
+            "product_id", "reason_id", "count"
+        ):
+            returns.setdefault(product_id, []).append((reason_names[reason_id], count))
+        existing = dict(SuggestedAction.objects.filter(product_id__in=ids).values_list("product_id", "is_manual"))
+        evidence = review_evidence
+        if evidence is None:
+            evidence = review_rule_hits(engine.review_rules, ids)
+
+        now = timezone.now()
+        rows = []
+        for product in products:
+            is_manual = existing.get(product.pk)
+            if is_manual:
+                summary["skipped"] += 1
+                continue
+            text = engine.evaluate(
+                product.average_rating, returns.get(product.pk, ()), review_hits=evidence.get(product.pk)
+            )
+            rows.append(SuggestedAction(product=product, action_text=text, generated_on=now, is_manual=False))
+            summary["created" if is_manual is None else "updated"] += 1
+
+        # One upsert per chunk: existing automatic rows are rewritten in place by the
+        # ON CONFLICT clause rather than with a per-row CASE/WHEN bulk_update
+        SuggestedAction.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["action_text", "generated_on"],
+        )
+
+    return summary
@@ -0,0 +1,397 @@
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from .cache import current_dataset_version, dashboard_cache_key
+from .filters import filter_products
+from .ingestion import iter_batches
+from .metrics import timed_section
+from .models import ReportJob, Return, ReturnReasonTotal, Sale, WeeklyTotal
+from .shadow import sync_active_database
+from .summaries import iter_product_summaries
+
+# Rows per ReportLab Table; small tables keep layout cost linear in the number of rows
+PDF_ROWS_PER_TABLE = 40
+
+
+# -------------------------------------------------------------------------
+# CSV
+# -------------------------------------------------------------------------
+class _Echo:
+    """Pseudo-buffer whose write() hands each CSV line straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+CSV_COLUMNS = [
+    "ASIN", "Product", "Average Rating", "Total GMV ($)",
+    "Units Sold", "Total Returns", "Top Issue", "Suggested Action",
+]
+
+
+def iter_csv_rows(products):
+    """Yield CSV lines (header first) for a product queryset, one chunk of products at a time."""
+    writer = csv.writer(_Echo(), lineterminator="\n")
+    yield writer.writerow(CSV_COLUMNS)
+    for summary in iter_product_summaries(products):
+        product = summary["product"]
+        yield writer.writerow([
+            product.asin,
+            product.name,
+            round(product.average_rating, 2),
+            round(product.total_gmv, 2),
+            product.total_units,
+            product.total_refunds,
+            summary["top_issue"] or "N/A",
+            summary["suggested_action"],
+        ])
+
+
+def build_csv(stream, products):
+    for line in iter_csv_rows(products):
+        stream.write(line.encode("utf-8"))
+
+
+# -------------------------------------------------------------------------
+# XLSX
+# -------------------------------------------------------------------------
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_PRODUCT_COLUMNS = CSV_COLUMNS + ["Review Count", "Return Rate (%)"]
+XLSX_WEEKLY_COLUMNS = ["Week", "GMV ($)", "Units Sold", "Refunds ($)"]
+XLSX_REASON_COLUMNS = ["Return Reason", "Units Returned", "Products Affected"]
+
+
+def _xlsx_sheet(workbook, title, columns, widths):
+    """Add a write-only sheet with a bold header row; rows can only be appended afterwards."""
+    sheet = workbook.create_sheet(title)
+    for index, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    return sheet
+
+
+def build_xlsx(stream, products):
+    """
+    Write the products, weekly sales and return reason sheets for ``products`` to ``stream``.
+
+    The workbook is opened in openpyxl's write-only mode, which spools each row to disk as it
+    is appended, and products are read through the chunked summary iterator, so memory stays
+    bounded however many products are exported.
+    """
+    workbook = Workbook(write_only=True)
+    is_filtered = products.query.has_filters()
+
+    # --- Products ---
+    sheet = _xlsx_sheet(workbook, "Products", XLSX_PRODUCT_COLUMNS, [14, 40, 14, 14, 12, 14, 28, 60, 14, 16])
+    for summary in iter_product_summaries(products):
+        product = summary["product"]
+        return_rate = 0
+        if product.total_units:
+            return_rate = round((summary["total_returns"] / product.total_units) * 100, 1)
+        sheet.append([
+            product.asin,
+            product.name,
+            round(product.average_rating, 2),
+            round(product.total_gmv, 2),
+            product.total_units,
+            summary["total_returns"],
+            summary["top_issue"] or "N/A",
+            summary["suggested_action"],
+            product.review_count,
+            return_rate,
+        ])
+
+    # --- Weekly sales (catalogue-wide rows come from the load-time rollup) ---
+    sheet = _xlsx_sheet(workbook, "Weekly Sales", XLSX_WEEKLY_COLUMNS, [10, 16, 14, 14])
+    if is_filtered:
+        weekly = (
+            Sale.objects.filter(product__in=products.values("pk"))
+            .values_list("week")
+            .annotate(Sum("gmv"), Sum("units_sold"), Sum("refunds"))
+            .order_by("week")
+        )
+    else:
+        weekly = WeeklyTotal.objects.values_list("week", "gmv", "units_sold", "refunds").order_by("week")
+    for week, gmv, units, refunds in weekly:
+        sheet.append([week, round(gmv or 0, 2), units or 0, round(refunds or 0, 2)])
+
+    # --- Return reasons ---
+    sheet = _xlsx_sheet(workbook, "Return Reasons", XLSX_REASON_COLUMNS, [28, 16, 18])
+    if is_filtered:
+        reasons = (
+            Return.objects.filter(product__in=products.values("pk"))
+            .values_list("reason_id")
+            .annotate(name=Min("reason__name"), total=Sum("count"), products=Count("product_id", distinct=True))
+            .values_list("name", "total", "products")
+            .order_by("-total", "name")
+        )
+    else:
+        reasons = ReturnReasonTotal.objects.values_list("reason__name", "total", "product_count").order_by(
+            "-total", "reason__name"
+        )
+    for reason, total, product_count in reasons:
+        sheet.append([reason, total or 0, product_count])
+
+    workbook.save(stream)
+
+
+# -------------------------------------------------------------------------
+# PDF
+# -------------------------------------------------------------------------
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007BFF')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+    ('LEFTPADDING', (0, 0), (-1, -1), 5),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+def build_pdf(stream, products):
+    """
+    Write the product performance report for ``products`` (ordered by name) to ``stream``.
+    Rows are laid out as a sequence of page-sized tables rather than one giant table.
+    """
+    doc = SimpleDocTemplate(
+        stream,
+        pagesize=letter,
+        leftMargin=40,
+        rightMargin=40,
+        topMargin=40,
+        bottomMargin=40
+    )
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Paragraph styles
+    header_style = ParagraphStyle(
+        name="HeaderCenter",
+        fontName="Helvetica-Bold",
+        fontSize=10,
+        alignment=TA_CENTER
+    )
+    normal_style = ParagraphStyle(
+        name="NormalLeft",
+        fontName="Helvetica",
+        fontSize=9,
+        leading=11,
+        alignment=TA_LEFT
+    )
+
+    # --- Title and Metadata ---
+    elements.append(Paragraph("■ Product Performance Report", styles['Title']))
+    elements.append(Paragraph(
+        f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        styles['Normal']
+    ))
+    elements.append(Paragraph("<br/>", styles['Normal']))
+
+    # --- Table Headers ---
+    headers = [
+        Paragraph("<b>Product Name</b>", header_style),
+        Paragraph("<b>GMV ($)</b>", header_style),
+        Paragraph("<b>Rating</b>", header_style),
+        Paragraph("<b>Return Rate (%)</b>", header_style),
+        Paragraph("<b>Top Issue</b>", header_style),
+        Paragraph("<b>Suggested Action</b>", header_style)
+    ]
+
+    # --- Table Configuration ---
+    weights = [18, 8, 6, 9, 14, 25]  # wider issue/suggestion columns
+    total_weight = sum(weights)
+    col_widths = [(w / total_weight) * doc.width for w in weights]
+
+    # --- Data Rows ---
+    summaries = iter_product_summaries(products.order_by("name"))
+    for chunk in iter_batches(summaries, PDF_ROWS_PER_TABLE):
+        table_data = [headers]
+        for summary in chunk:
+            p = summary["product"]
+            # calculate return rate
+            total_units = p.total_units or 0
+            return_rate = 0
+            if total_units > 0:
+                return_rate = round((summary["total_returns"] / total_units) * 100, 1)
+
+            # use Paragraphs for wrapping
+            table_data.append([
+                Paragraph(p.name, normal_style),
+                Paragraph(f"${p.total_gmv:,.0f}", normal_style),
+                Paragraph(f"{p.average_rating:.1f}", normal_style),
+                Paragraph(f"{return_rate:.1f}%", normal_style),
+                Paragraph(summary["top_issue"] or "N/A", normal_style),
+                Paragraph(summary["suggested_action"].replace(". ", ".<br/>"), normal_style)
+            ])
+
+        table = Table(table_data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(PDF_TABLE_STYLE)
+        elements.append(table)
+
+    # --- Build PDF ---
+    with timed_section("pdf_layout"):
+        doc.build(elements)
+
+
+# -------------------------------------------------------------------------
+# BACKGROUND REPORT JOBS
+# -------------------------------------------------------------------------
+# kind -> (builder, content type, file extension)
+REPORT_FORMATS = {
+    "pdf": (build_pdf, "application/pdf", "pdf"),
+    "csv": (build_csv, "text/csv", "csv"),
+    "xlsx": (build_xlsx, XLSX_CONTENT_TYPE, "xlsx"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-local worker pool shared by all report jobs."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "REPORT_WORKERS", 2),
+                thread_name_prefix="report",
+            )
+        return _executor
+
+
+def enqueue_report(kind, filters, executor=None):
+    """
+    Return the report job for ``kind`` / ``filters`` at the current dataset version,
+    queueing a new build only if no finished or live in-flight job exists for that key.
+    An in-flight job left behind by a crash (see :func:`is_stale`) is marked failed and
+    rebuilt; creating a build also prunes the reports of older dataset versions.
+    """
+    if kind not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format: {kind}")
+
+    version = current_dataset_version()
+    key = dashboard_cache_key(f"report-{kind}", filters, version)
+    job = (
+        ReportJob.objects.filter(cache_key=key)
+        .exclude(status=ReportJob.FAILED)
+        .order_by("-created_at")
+        .first()
+    )
+    if job is not None:
+        if job.status == ReportJob.DONE:
+            if os.path.exists(job.file_path):
+                return job
+        elif not is_stale(job):
+            return job
+        else:
+            # Only the first request to see the abandoned job flips it
+            ReportJob.objects.filter(pk=job.pk, status=job.status).update(
+                status=ReportJob.FAILED, error="Abandoned: worker timed out or exited", finished_at=timezone.now()
+            )
+
+    prune_reports(version)
+    job = ReportJob.objects.create(
+        kind=kind, filters=filters, dataset_version=version, cache_key=key, worker_pid=os.getpid()
+    )
+    (executor or get_executor()).submit(run_report_job, job.pk)
+    job.refresh_from_db()  # small reports may already be finished
+    return job
+
+
+def is_stale(job):
+    """
+    True for a queued or running job older than REPORT_JOB_TIMEOUT, or whose worker
+    process no longer exists (jobs only run in the pool of the process that queued them).
+    """
+    if job.created_at < timezone.now() - _job_timeout():
+        return True
+    return job.worker_pid is not None and not _process_alive(job.worker_pid)
+
+
+def _job_timeout():
+    return timedelta(seconds=getattr(settings, "REPORT_JOB_TIMEOUT", 15 * 60))
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, but belongs to another user
+        pass
+    return True
+
+
+def prune_reports(version):
+    """
+    Delete the jobs of dataset versions other than ``version`` that are finished (or
+    past the timeout), together with their files under REPORTS_ROOT.
+    """
+    old = ReportJob.objects.exclude(dataset_version=version).filter(
+        Q(status__in=[ReportJob.DONE, ReportJob.FAILED]) | Q(created_at__lt=timezone.now() - _job_timeout())
+    )
+    for job_id, kind in old.values_list("pk", "kind"):
+        path = os.path.join(settings.REPORTS_ROOT, f"{job_id}.{REPORT_FORMATS[kind][2]}")
+        for leftover in (path, path + ".part"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return old.delete()[0]
+
+
+def run_report_job(job_id):
+    """Build one queued report to a file under REPORTS_ROOT and record the outcome."""
+    close_old_connections()
+    sync_active_database()
+    try:
+        # Claim the job; one already marked abandoned is not built
+        if not ReportJob.objects.filter(pk=job_id, status=ReportJob.QUEUED).update(status=ReportJob.RUNNING):
+            return
+        job = ReportJob.objects.get(pk=job_id)
+
+        builder, _, extension = REPORT_FORMATS[job.kind]
+        os.makedirs(settings.REPORTS_ROOT, exist_ok=True)
+        final_path = os.path.join(settings.REPORTS_ROOT, f"{job.pk}.{extension}")
+        partial_path = final_path + ".part"
+        with open(partial_path, "wb") as stream:
+            builder(stream, filter_products(job.filters))
+        os.replace(partial_path, final_path)
+
+        job.status = ReportJob.DONE
+        job.file_path = final_path
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "file_path", "finished_at"])
+    except Exception as exc:
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.FAILED, error=str(exc), finished_at=timezone.now()
+        )
+    finally:
+        # Worker threads own their database connections
+        connections.close_all()
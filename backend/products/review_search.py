@@ -0,0 +1,84 @@
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Review
+
+FTS_TABLE = "products_review_fts"
+_WORD = re.compile(r"\w+")
+# Row-by-row indexing trigger, restored after bulk loads. Migration 0005_review_fts keeps
+# its own frozen copy of the schema, as migrations should not import application code.
+INSERT_TRIGGER_SQL = f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON products_review BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, review_text) VALUES (new.id, new.review_text);
+    END"""
+
+
+def match_expression(terms):
+    """
+    FTS5 query matching reviews that contain any of ``terms``. Words match as prefixes
+    ("defect" finds "defective") and multi-word terms as phrases. None if nothing is searchable.
+    """
+    phrases = []
+    for term in terms:
+        words = _WORD.findall(term.lower())
+        if words:
+            # Word characters only, so the quoted phrase needs no escaping
+            phrases.append('"%s"*' % " ".join(words))
+    return " OR ".join(phrases) or None
+
+
+def matching_reviews(terms):
+    """Review queryset matching any of ``terms`` through the full-text index."""
+    expression = match_expression(terms)
+    if expression is None:
+        return Review.objects.none()
+    if connection.vendor != "sqlite":
+        condition = Q()
+        for term in terms:
+            condition |= Q(review_text__icontains=term)
+        return Review.objects.filter(condition)
+    return Review.objects.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+    )
+
+
+def review_hits(terms, products=None):
+    """``{product_id: matching reviews}`` across the catalogue, or within the ``products`` queryset."""
+    reviews = matching_reviews(terms)
+    if products is not None:
+        reviews = reviews.filter(product__in=products)
+    return dict(
+        reviews.order_by().values("product_id").annotate(hits=Count("id")).values_list("product_id", "hits")
+    )
+
+
+def optimize_review_index():
+    """Merge the index segments written during a load so later searches read fewer b-trees."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def suspend_review_indexing():
+    """
+    Stop indexing inserted reviews row by row, for bulk loads that call
+    :func:`rebuild_review_index` once at the end (several times faster). Must run inside
+    a transaction, so a failed load rolls the dropped trigger back as well.
+    """
+    if connection.vendor != "sqlite":
+        return
+    if not connection.in_atomic_block:
+        raise RuntimeError("suspend_review_indexing() must be called inside a transaction.")
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TRIGGER {FTS_TABLE}_ai")
+
+
+def rebuild_review_index():
+    """Restore row-by-row indexing and rebuild the whole index from the reviews table."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_TRIGGER_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Return, ReturnReason, ReturnReasonTotal, Sale, WeeklyTotal
+
+
+def rebuild_rollups():
+    """Recompute the catalogue-wide weekly and return-reason totals from scratch."""
+    weekly = (
+        Sale.objects.values("week")
+        .annotate(gmv=Sum("gmv"), units=Sum("units_sold"), refunds=Sum("refunds"), rows=Count("id"))
+        .order_by()
+    )
+    reasons = (
+        Return.objects.values("reason_id")
+        .annotate(total=Sum("count"), products=Count("product_id", distinct=True))
+        .order_by()
+    )
+    with transaction.atomic():
+        WeeklyTotal.objects.all().delete()
+        ReturnReasonTotal.objects.all().delete()
+        WeeklyTotal.objects.bulk_create(
+            WeeklyTotal(
+                week=row["week"], gmv=row["gmv"] or 0, units_sold=row["units"] or 0,
+                refunds=row["refunds"] or 0, sale_count=row["rows"],
+            )
+            for row in weekly
+        )
+        ReturnReasonTotal.objects.bulk_create(
+            ReturnReasonTotal(reason_id=row["reason_id"], total=row["total"] or 0, product_count=row["products"])
+            for row in reasons
+        )
+
+
+class RollupDelta:
+    """
+    Accumulates changes to the rollups during an incremental load and applies them once.
+
+    Call :meth:`subtract_products` before a product's rows are deleted and
+    :meth:`add_records` with the normalised records that replace them.
+    """
+
+    def __init__(self):
+        self.weeks = {}
+        self.reasons = {}
+
+    def _week(self, week):
+        return self.weeks.setdefault(int(week), [0, 0, 0, 0])
+
+    def _reason(self, reason):
+        return self.reasons.setdefault(reason, [0, 0])
+
+    def subtract_products(self, product_ids):
+        if not product_ids:
+            return
+        weekly = (
+            Sale.objects.filter(product_id__in=product_ids)
+            .values_list("week")
+            .annotate(Sum("gmv"), Sum("units_sold"), Sum("refunds"), Count("id"))
+            .order_by()
+        )
+        for week, gmv, units, refunds, rows in weekly:
+            totals = self._week(week)
+            totals[0] -= gmv or 0
+            totals[1] -= units or 0
+            totals[2] -= refunds or 0
+            totals[3] -= rows
+        reasons = (
+            Return.objects.filter(product_id__in=product_ids)
+            .values_list("reason__name")
+            .annotate(Sum("count"), Count("id"))
+            .order_by()
+        )
+        for reason, total, rows in reasons:
+            totals = self._reason(reason)
+            totals[0] -= total or 0
+            totals[1] -= rows
+
+    def add_records(self, records):
+        for record in records:
+            for week, units, gmv, refunds in record["sales"]:
+                totals = self._week(week)
+                totals[0] += gmv
+                totals[1] += units
+                totals[2] += refunds
+                totals[3] += 1
+            for reason, count in record["returns"]:
+                totals = self._reason(reason)
+                totals[0] += count
+                totals[1] += 1
+
+    def apply(self):
+        """Write the accumulated deltas, dropping rows that no longer have any source data."""
+        reason_ids = ReturnReason.objects.intern(self.reasons)
+        reasons = {reason_ids[name]: values for name, values in self.reasons.items()}
+        with transaction.atomic():
+            self._apply(WeeklyTotal, "week", self.weeks, ["gmv", "units_sold", "refunds", "sale_count"])
+            self._apply(ReturnReasonTotal, "reason_id", reasons, ["total", "product_count"])
+        self.weeks, self.reasons = {}, {}
+
+    @staticmethod
+    def _apply(model, key_field, deltas, fields):
+        if not deltas:
+            return
+        existing = {getattr(row, key_field): row for row in model.objects.filter(**{f"{key_field}__in": list(deltas)})}
+        to_create, to_update, to_delete = [], [], []
+        for key, values in deltas.items():
+            row = existing.get(key) or model(**{key_field: key})
+            for field, value in zip(fields, values):
+                setattr(row, field, getattr(row, field) + value)
+            if getattr(row, fields[-1]) <= 0:
+                if row.pk:
+                    to_delete.append(row.pk)
+            elif row.pk:
+                to_update.append(row)
+            else:
+                to_create.append(row)
+        model.objects.filter(pk__in=to_delete).delete()
+        model.objects.bulk_update(to_update, fields)
+        model.objects.bulk_create(to_create)
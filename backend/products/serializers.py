@@ -0,0 +1,65 @@
+from rest_framework import serializers
+
+from .models import Product, Return, Sale, SuggestedAction
+from .summaries import NO_SUGGESTION
+
+
+class SparseFieldsMixin:
+    """
+    Limits a serializer's output to the comma-separated ``?fields=`` of the current request.
+    Unknown names are rejected so typos don't silently return empty objects.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = request.query_params.get("fields", "") if request is not None else ""
+        names = {name.strip() for name in requested.split(",") if name.strip()}
+        if not names:
+            return
+
+        unknown = names - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        for name in set(self.fields) - names:
+            self.fields.pop(name)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    suggested_action = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            "asin", "name", "average_rating", "total_gmv", "total_units",
+            "total_refunds", "total_returns", "review_count", "suggested_action",
+        ]
+
+    def get_suggested_action(self, product):
+        suggestion = getattr(product, "suggested_action_entry", None)
+        return suggestion.action_text if suggestion else NO_SUGGESTION
+
+
+class SaleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    asin = serializers.CharField(source="product.asin", read_only=True)
+
+    class Meta:
+        model = Sale
+        fields = ["asin", "week", "units_sold", "gmv", "refunds"]
+
+
+class ReturnSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    asin = serializers.CharField(source="product.asin", read_only=True)
+    return_reason = serializers.CharField(source="reason.name", read_only=True)
+
+    class Meta:
+        model = Return
+        fields = ["asin", "return_reason", "count"]
+
+
+class SuggestedActionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    asin = serializers.CharField(source="product.asin", read_only=True)
+
+    class Meta:
+        model = SuggestedAction
+        fields = ["asin", "action_text", "is_manual", "generated_on"]
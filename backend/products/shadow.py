@@ -0,0 +1,182 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections
+from django.db.models import Sum
+
+from .models import Product, Sale, WeeklyTotal
+from .review_search import FTS_TABLE
+
+# Bulk-load tuning for the shadow file: nobody reads it until it is verified and
+# activated, so durability is traded for write throughput until the final checkpoint.
+SHADOW_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA temp_store=MEMORY",
+)
+SHADOW_PREFIX = "db-"
+SHADOW_SUFFIX = ".sqlite3"
+
+_pointer_lock = threading.Lock()
+_pointer_cache = {"mtime": None, "name": None}
+
+
+class ShadowVerificationError(Exception):
+    """The freshly built shadow database failed its checks and was not activated."""
+
+
+def pointer_file():
+    return Path(settings.DATABASE_POINTER_FILE)
+
+
+def read_pointer():
+    """File name of the active database, or None before the first blue/green load."""
+    pointer = pointer_file()
+    try:
+        mtime = pointer.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _pointer_lock:
+        if _pointer_cache["mtime"] != mtime:
+            _pointer_cache.update(mtime=mtime, name=pointer.read_text(encoding="utf-8").strip())
+        return _pointer_cache["name"]
+
+
+def _is_managed(name):
+    """Only file databases next to the pointer are swapped (never e.g. an in-memory test database)."""
+    path = Path(str(name))
+    return path.suffix == SHADOW_SUFFIX and path.parent == pointer_file().parent
+
+
+def sync_active_database():
+    """
+    Point this thread's default connection at the database named by the pointer file.
+    A connection still open on an older file is closed first, so every request reads
+    from exactly one database for its whole duration.
+    """
+    name = read_pointer()
+    settings_dict = connection.settings_dict
+    if name is None or not _is_managed(settings_dict["NAME"]):
+        return
+    target = pointer_file().parent / name
+    if getattr(connection, "active_database", None) != target:
+        connection.close()
+        # A private copy: the original dict is shared by every thread's connection, and
+        # rewriting it would move other threads' connections in the middle of a request
+        connection.settings_dict = {**settings_dict, "NAME": target}
+        connection.active_database = target
+
+
+class ActiveDatabaseMiddleware:
+    """Switches readers to a newly activated database between requests."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sync_active_database()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # On the thread that runs this request's synchronous ORM calls
+        await sync_to_async(sync_active_database)()
+        return await self.get_response(request)
+
+
+def create_shadow():
+    """Copy the live database into a new, not yet active file and return its path."""
+    path = pointer_file().parent / f"{SHADOW_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}{SHADOW_SUFFIX}"
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        # Online backup: a consistent snapshot that keeps users, report jobs and dataset versions
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    return path
+
+
+@contextmanager
+def use_database(path, pragmas=()):
+    """Temporarily swap this thread's default connection for one on ``path``."""
+    original = connections[DEFAULT_DB_ALIAS]
+    shadow = original.__class__({**original.settings_dict, "NAME": path}, DEFAULT_DB_ALIAS)
+    connections[DEFAULT_DB_ALIAS] = shadow
+    try:
+        with shadow.cursor() as cursor:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        yield shadow
+    finally:
+        shadow.close()
+        connections[DEFAULT_DB_ALIAS] = original
+
+
+def verify_shadow(product_count):
+    """Raise ShadowVerificationError unless the current database holds a complete, consistent load."""
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA quick_check")
+        result = cursor.fetchone()[0]
+        if result != "ok":
+            raise ShadowVerificationError(f"Integrity check failed: {result}")
+        cursor.execute("PRAGMA foreign_key_check")
+        if cursor.fetchone() is not None:
+            raise ShadowVerificationError("Foreign key check failed.")
+        try:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+        except DatabaseError as exc:
+            raise ShadowVerificationError(f"Review search index check failed: {exc}") from exc
+
+    loaded = Product.objects.count()
+    if loaded != product_count:
+        raise ShadowVerificationError(f"Expected {product_count} products, found {loaded}.")
+    sales_gmv = Sale.objects.aggregate(gmv=Sum("gmv"))["gmv"] or 0
+    rollup_gmv = WeeklyTotal.objects.aggregate(gmv=Sum("gmv"))["gmv"] or 0
+    if abs(sales_gmv - rollup_gmv) > 1e-6 * max(1.0, abs(sales_gmv)):
+        raise ShadowVerificationError(f"Weekly rollups ({rollup_gmv}) do not match sales ({sales_gmv}).")
+
+
+def finalize_shadow():
+    """Fold the WAL into the main file and refresh planner statistics before readers arrive."""
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cursor.execute("PRAGMA optimize")
+
+
+def activate(path, keep=1):
+    """
+    Atomically make ``path`` the live database by replacing the pointer file, then
+    delete all but the ``keep`` most recent earlier shadow generations.
+    """
+    pointer = pointer_file()
+    partial = pointer.with_name(pointer.name + ".part")
+    partial.write_text(Path(path).name, encoding="utf-8")
+    os.replace(partial, pointer)
+
+    generations = sorted(pointer.parent.glob(f"{SHADOW_PREFIX}*{SHADOW_SUFFIX}"), reverse=True)
+    older = [generation for generation in generations if generation.name != Path(path).name]
+    for stale in older[keep:]:
+        discard(stale)
+
+
+def discard(path):
+    """Delete a database file and its WAL / shared-memory companions."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(f"{path}{suffix}")
+        except FileNotFoundError:
+            pass
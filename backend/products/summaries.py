@@ -0,0 +1,46 @@
+from django.db.models import Sum
+
+from .ingestion import iter_batches
+from .models import Return, ReturnReason
+
+NO_SUGGESTION = "No suggestion available"
+
+
+def iter_product_summaries(products, chunk_size=2000):
+    """
+    Yield one summary dict per product of ``products`` (in the queryset's order) with:
+    ``product``, ``issues`` (reason -> returned units, largest first), ``top_issue``,
+    ``total_returns`` and ``suggested_action``.
+
+    Products and their suggestion come from one joined query streamed in chunks; each
+    chunk then costs a single grouped query for return reasons (grouped by integer key and
+    named from the small ReturnReason table), so the query count does not depend on how
+    many products are summarised.
+    """
+    reason_names = ReturnReason.objects.names()
+    rows = products.select_related("suggested_action_entry").iterator(chunk_size=chunk_size)
+    for chunk in iter_batches(rows, chunk_size):
+        issues = {}
+        reason_totals = (
+            Return.objects.filter(product_id__in=[product.pk for product in chunk])
+            .values_list("product_id", "reason_id")
+            .annotate(total=Sum("count"))
+            .order_by()
+        )
+        for product_id, reason_id, total in reason_totals:
+            issues.setdefault(product_id, []).append((reason_names[reason_id], total))
+
+        for product in chunk:
+            yield _summarise(product, issues.get(product.pk, []))
+
+
+def _summarise(product, reasons):
+    reasons.sort(key=lambda item: (-item[1], item[0]))
+    suggestion = getattr(product, "suggested_action_entry", None)
+    return {
+        "product": product,
+        "issues": dict(reasons),
+        "top_issue": reasons[0][0] if reasons else None,
+        "total_returns": sum(total for _, total in reasons),
+        "suggested_action": suggestion.action_text if suggestion else NO_SUGGESTION,
+    }
@@ -1,3 +1,872 @@
-from django.test import TestCase
+import copy
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from contextlib import closing
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from . import shadow
+from .aggregates import AGGREGATE_FIELDS, refresh_product_aggregates
+from .cache import LRUFileBasedCache
+from .charts import lttb
+from .datagen import generate_products, write_dataset
+from .filters import filter_products
+from .ingestion import build_record, iter_products, iter_record_batches
+from .models import (
+    DatasetLoad, Product, ReportJob, Return, ReturnReason, ReturnReasonTotal, Review, Sale, SuggestedAction,
+    WeeklyTotal,
+)
+from .periods import PERIODS, compare_periods, weekly_series
+from .recommendations import KeywordMatcher, RecommendationEngine, generate_suggestions
+from .reports import XLSX_PRODUCT_COLUMNS, enqueue_report
+from .review_search import review_hits
+from .rollups import rebuild_rollups
+from .summaries import iter_product_summaries
+from .trends import WeeklyPivot
+
+
+def make_products(count, prefix="ASIN"):
+    """Create ``count`` products, each with two weeks of sales and two reviews."""
+    products = Product.objects.bulk_create(
+        [Product(asin=f"{prefix}-{i}", name=f"Product {i}") for i in range(count)]
+    )
+    Sale.objects.bulk_create(
+        Sale(product=p, week=week, units_sold=10 * week, gmv=100.0 * week, refunds=1.5)
+        for p in products for week in (1, 2)
+    )
+    Review.objects.bulk_create(
+        Review(product=p, review_text="Good value", rating=rating)
+        for p in products for rating in (2, 5)
+    )
+    return products
+
+
+def rollup_snapshot():
+    """Every WeeklyTotal and ReturnReasonTotal row, for comparing two loads."""
+    return (
+        list(WeeklyTotal.objects.order_by("week").values_list("week", "gmv", "units_sold", "refunds", "sale_count")),
+        sorted(ReturnReasonTotal.objects.values_list("reason__name", "total", "product_count")),
+    )
+
+
+class ProductAggregateTests(TestCase):
+    def test_aggregates_match_source_rows(self):
+        make_products(2)
+        Product.objects.create(asin="EMPTY", name="No activity")
+
+        refresh_product_aggregates()
+
+        product = Product.objects.get(asin="ASIN-0")
+        self.assertEqual(product.total_gmv, 300.0)
+        self.assertEqual(product.total_units, 30)
+        self.assertEqual(product.total_refunds, 3)
+        self.assertEqual(product.average_rating, 3.5)
+
+        empty = Product.objects.get(asin="EMPTY")
+        self.assertEqual((empty.total_gmv, empty.total_units, empty.average_rating), (0, 0, 0))
+
+    def test_query_count_does_not_grow_with_catalogue(self):
+        make_products(3)
+        # savepoint, reset, one UPDATE ... FROM per source (sales, reviews, returns), release
+        with self.assertNumQueries(6):
+            refresh_product_aggregates()
+
+        make_products(60, prefix="MORE")
+        with self.assertNumQueries(6):
+            refresh_product_aggregates()
+
+    def test_large_catalogue_is_refreshed_in_bulk(self):
+        products = make_products(5000)
+        reason = ReturnReason.objects.intern(["Damaged item"])["Damaged item"]
+        Return.objects.bulk_create(Return(product=p, reason_id=reason, count=2) for p in products[::2])
+
+        # The same statements however many products: no per-row CASE/WHEN update
+        with self.assertNumQueries(6):
+            self.assertEqual(refresh_product_aggregates(), 5000)
+
+        totals = Product.objects.aggregate(
+            gmv=Sum("total_gmv"), returns=Sum("total_returns"), reviews=Sum("review_count")
+        )
+        self.assertEqual(totals, {"gmv": 5000 * 300.0, "returns": 2500 * 2, "reviews": 5000 * 2})
+        self.assertEqual(
+            set(Product.objects.values_list("total_refunds", "average_rating").distinct()), {(3, 3.5)}
+        )
+
+    def test_only_requested_asins_are_refreshed(self):
+        make_products(2)
+        with self.assertNumQueries(6):
+            refresh_product_aggregates(asins=["ASIN-1"])
+
+        self.assertEqual(Product.objects.get(asin="ASIN-1").total_gmv, 300.0)
+        self.assertEqual(Product.objects.get(asin="ASIN-0").total_gmv, 0)
+
+
+class QueryScalingTests(TestCase):
+    def setUp(self):
+        caches["dashboard"].clear()
+
+    def add_products(self, count, prefix):
+        products = make_products(count, prefix=prefix)
+        reasons = ReturnReason.objects.intern(["Damaged item", "Late delivery"])
+        Return.objects.bulk_create(
+            Return(product=p, reason_id=reason_id, count=index + 1)
+            for p in products for index, reason_id in enumerate(reasons.values())
+        )
+        refresh_product_aggregates()
+
+    def test_summaries_and_weekly_pivot_stay_flat(self):
+        for count, prefix in ((3, "ASIN"), (60, "MORE")):
+            self.add_products(count, prefix)
+            # reason names + the product/suggestion join + one grouped returns query per chunk
+            with self.assertNumQueries(3):
+                summaries = list(iter_product_summaries(Product.objects.all()))
+            with self.assertNumQueries(1):
+                pivot = WeeklyPivot(Sale.objects.all())
+
+        self.assertEqual(len(summaries), 63)
+        self.assertEqual(summaries[0]["top_issue"], "Late delivery")
+        self.assertEqual(summaries[0]["total_returns"], 3)
+        self.assertEqual(pivot.week_total(2, "units"), 63 * 20)
+
+    def test_csv_export_is_streamed(self):
+        counts = []
+        for count, prefix in ((3, "ASIN"), (60, "MORE")):
+            self.add_products(count, prefix)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("export_csv"))
+                self.assertIsInstance(response, StreamingHttpResponse)
+                lines = b"".join(response.streaming_content).decode().splitlines()
+            counts.append(len(queries))
+
+        self.assertEqual(len(lines), 64)
+        self.assertEqual(counts[0], counts[1])
+
+
+class IssueFilterTests(TestCase):
+    def setUp(self):
+        caches["dashboard"].clear()
+        products = make_products(3)
+        reasons = ReturnReason.objects.intern(["Damaged item", "Late delivery"])
+        Return.objects.bulk_create([
+            Return(product=products[0], reason_id=reasons["Damaged item"], count=2),
+            Return(product=products[0], reason_id=reasons["Late delivery"], count=1),
+            Return(product=products[2], reason_id=reasons["Late delivery"], count=4),
+        ])
+        refresh_product_aggregates()
+        rebuild_rollups()
+
+    def test_issue_narrows_products_everywhere(self):
+        filters = {"product": "", "issue": "Late delivery", "rating": ""}
+        self.assertEqual(sorted(filter_products(filters).values_list("asin", flat=True)), ["ASIN-0", "ASIN-2"])
+
+        response = self.client.get(reverse("product_dashboard") + "?issue=Late+delivery")
+        self.assertEqual([row["asin"] for row in response.context["products"]()], ["ASIN-0", "ASIN-2"])
+        self.assertEqual(response.context["all_issues"], ["Damaged item", "Late delivery"])
+
+        api = self.client.get(reverse("api-product-list") + "?issue=Damaged+item&fields=asin").json()
+        self.assertEqual([row["asin"] for row in api["results"]], ["ASIN-0"])
+
+    def test_unknown_issue_matches_nothing(self):
+        self.assertFalse(filter_products({"product": "", "issue": "Nope", "rating": ""}).exists())
+
+
+class PeriodComparisonTests(TestCase):
+    def test_every_window_is_folded_from_one_series(self):
+        series = [(week, 100.0 * week, week, 0) for week in range(1, 9)]
+        periods = compare_periods(series)
+
+        self.assertEqual(periods["wow"]["change"], {"gmv": 14.3, "units": 14.3, "refunds": None})
+        self.assertEqual((periods["4w"]["current"]["units"], periods["4w"]["previous"]["units"]), (26, 10))
+        self.assertEqual(periods["4w"]["change"]["gmv"], 160.0)
+        # Eight weeks cannot cover two 13-week windows
+        self.assertFalse(periods["13w"]["comparable"])
+        self.assertEqual(periods["13w"]["change"]["gmv"], None)
+
+    def test_dashboard_cards_use_the_selected_window(self):
+        make_products(2)
+        refresh_product_aggregates()
+        rebuild_rollups()
+        with self.assertNumQueries(1):
+            self.assertEqual([week for week, *_ in weekly_series()], [1, 2])
+
+        response = self.client.get(reverse("product_dashboard") + "?product=ASIN-1&period=4w")
+        self.assertEqual(response.context["gmv_change"], None)
+        self.assertEqual(set(response.context["periods"]), set(PERIODS))
+
+        response = self.client.get(reverse("product_dashboard") + "?period=bogus")
+        self.assertEqual(response.context["selected_period"], "wow")
+        self.assertEqual((response.context["gmv_change"], response.context["refunds_change"]), (100.0, 0.0))
+        self.assertIsNone(response.context["rating_change"])
+
+
+class ChartDataTests(TestCase):
+    def setUp(self):
+        caches["dashboard"].clear()
+        make_products(4)
+        reasons = ReturnReason.objects.intern(["Damaged item", "Late delivery", "Wrong color"])
+        product = Product.objects.get(asin="ASIN-0")
+        Return.objects.bulk_create(
+            Return(product=product, reason_id=reasons[name], count=count)
+            for name, count in (("Damaged item", 5), ("Late delivery", 3), ("Wrong color", 1))
+        )
+        refresh_product_aggregates()
+        rebuild_rollups()
+
+    def test_lttb_keeps_the_ends_and_the_spikes(self):
+        series = [(week, 100.0) for week in range(1, 201)]
+        series[120] = (121, 900.0)
+        sampled = lttb(series, 20)
+
+        self.assertEqual(len(sampled), 20)
+        self.assertEqual((sampled[0], sampled[-1]), (series[0], series[-1]))
+        self.assertIn((121, 900.0), sampled)
+        self.assertEqual(lttb(series[:5], 20), series[:5])
+
+    def test_gmv_chart_has_top_products_and_an_other_series(self):
+        payload = self.client.get(reverse("gmv_chart") + "?top=2&points=3").json()
+
+        labels = [dataset["label"] for dataset in payload["datasets"]]
+        self.assertEqual(labels, ["Product 0", "Product 1", "Other (2 products)"])
+        self.assertEqual(payload["datasets"][2]["data"], [{"x": 1, "y": 200.0}, {"x": 2, "y": 400.0}])
+        self.assertEqual(payload["weeks"], [1, 2])
+
+        narrowed = self.client.get(reverse("gmv_chart") + "?product=ASIN-3&top=999").json()
+        self.assertEqual([dataset["label"] for dataset in narrowed["datasets"]], ["Product 3"])
+
+    def test_reason_chart_buckets_the_tail(self):
+        payload = self.client.get(reverse("reason_chart") + "?top=1").json()
+        self.assertEqual(payload["labels"], ["Damaged item (5 Returns)", "Other (2 reasons) (4 Returns)"])
+        self.assertEqual(payload["total"], 9)
+
+        response = self.client.get(reverse("product_dashboard"))
+        self.assertNotContains(response, "Damaged item (5 Returns)")
+        self.assertContains(response, reverse("reason_chart"))
+
+
+class TimeSeriesSchemaTests(TestCase):
+    def test_weeks_sort_numerically(self):
+        product = Product.objects.create(asin="WEEKS", name="Weeks")
+        Sale.objects.bulk_create(
+            Sale(product=product, week=week, units_sold=1, gmv=week) for week in (10, 2, 1)
+        )
+        self.assertEqual(WeeklyPivot(Sale.objects.all()).weeks, [1, 2, 10])
+
+    def test_return_reasons_are_interned_once(self):
+        first = ReturnReason.objects.intern(["Damaged", "Late delivery"])
+        second = ReturnReason.objects.intern(["Late delivery", "Wrong size"])
+
+        self.assertEqual(second["Late delivery"], first["Late delivery"])
+        self.assertEqual(ReturnReason.objects.count(), 3)
+        self.assertEqual(ReturnReason.objects.intern([]), {})
+
+
+class StreamingParserTests(SimpleTestCase):
+    # Whitespace and commas in odd places, numbers long enough to straddle small buffers,
+    # and brackets, quotes and backslashes inside strings
+    DATASET = (
+        '{ "version" : "v2" ,\n\t"products" :[\n'
+        '  {"asin": "A1", "sales": [{"week": 1, "gmv": 1234567.125}] } ,\n'
+        '{"asin":"A2","reviews":[{"review_text":"Good , value ]} \\"so\\" \\\\ {[","rating":5}]}  ,  \r\n'
+        '  {"asin": "A3", "count": 123456789012345678, "deep": [[[[{"x": "]"}]]]]}\n'
+        ' ] , "generated_at" : 20250101 }\n'
+    )
+
+    def write(self, content):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        path = os.path.join(workdir, "dataset.json")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        return path
+
+    def test_tiny_buffers_give_the_same_entries(self):
+        path = self.write(self.DATASET)
+        expected = json.loads(self.DATASET)
+        for chunk_size in (1, 2, 3, 5, 7, 16, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                header = {}
+                self.assertEqual(list(iter_products(path, header, chunk_size=chunk_size)), expected["products"])
+                self.assertEqual(header, {"version": "v2", "generated_at": 20250101})
+                raw = list(iter_products(path, chunk_size=chunk_size, raw=True))
+                self.assertEqual([json.loads(text) for text in raw], expected["products"])
+
+    def test_truncated_or_malformed_input_raises(self):
+        cases = {
+            "truncated inside a product": self.DATASET[:60],
+            "truncated after a product": self.DATASET[:self.DATASET.index("} ,") + 1],
+            "missing comma between products": '{"products": [{"asin": "A1"} {"asin": "A2"}]}',
+            "not an object": '[{"asin": "A1"}]',
+            "invalid value": '{"products": [{"asin": A1}]}',
+        }
+        for name, content in cases.items():
+            path = self.write(content)
+            for chunk_size in (3, 1 << 16):
+                with self.subTest(name, chunk_size=chunk_size):
+                    with self.assertRaisesRegex(ValueError, "^Malformed dataset"):
+                        list(iter_products(path, chunk_size=chunk_size))
+                    # Raw entries are only delimited here; invalid values fail when decoded
+                    if name != "invalid value":
+                        with self.assertRaisesRegex(ValueError, "^Malformed dataset"):
+                            list(iter_products(path, chunk_size=chunk_size, raw=True))
+
+
+class DatasetGeneratorTests(SimpleTestCase):
+    def test_same_seed_gives_the_same_dataset(self):
+        first, second = io.StringIO(), io.StringIO()
+        write_dataset(first, 20, weeks=4, seed=7)
+        write_dataset(second, 20, weeks=4, seed=7)
+
+        self.assertEqual(first.getvalue(), second.getvalue())
+        self.assertNotEqual(list(generate_products(5, seed=7)), list(generate_products(5, seed=8)))
+
+    def test_output_streams_through_the_loader(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        path = os.path.join(workdir, "dataset.json")
+        with open(path, "w", encoding="utf-8") as stream:
+            write_dataset(stream, 25, weeks=6)
+
+        header = {}
+        records = [build_record(item) for item in iter_products(path, header)]
+
+        self.assertEqual(header["version"], "synthetic")
+
+        self.assertEqual(len(records), 25)
+        self.assertEqual(len({record["asin"] for record in records}), 25)
+        self.assertTrue(all([week for week, *_ in record["sales"]] == list(range(1, 7)) for record in records))
+
+
+class ShadowLoadTests(TransactionTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        settings_override = override_settings(DATABASE_POINTER_FILE=os.path.join(self.workdir, "db.current"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.dataset = os.path.join(self.workdir, "dataset.json")
+        with open(self.dataset, "w", encoding="utf-8") as stream:
+            write_dataset(stream, 30, weeks=4)
+
+    def test_load_is_built_aside_and_then_activated(self):
+        make_products(2, prefix="LIVE")
+        call_command("load_kpis", dataset=self.dataset, shadow=True, stdout=io.StringIO())
+
+        # The live database is untouched; the new file holds the load and is named by the pointer
+        self.assertEqual(Product.objects.count(), 2)
+        name = shadow.read_pointer()
+        with closing(sqlite3.connect(os.path.join(self.workdir, name))) as db:
+            self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM products_product").fetchone()[0], 30)
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM products_datasetload").fetchone()[0], 1)
+
+    def test_failed_verification_keeps_the_live_database(self):
+        with mock.patch.object(shadow, "verify_shadow", side_effect=shadow.ShadowVerificationError("bad")):
+            with self.assertRaises(shadow.ShadowVerificationError):
+                call_command("load_kpis", dataset=self.dataset, shadow=True, stdout=io.StringIO())
+
+        self.assertIsNone(shadow.read_pointer())
+        self.assertEqual(os.listdir(self.workdir), ["dataset.json"])
+
+    def test_switching_one_connection_leaves_the_shared_settings_alone(self):
+        wrapper = connections[DEFAULT_DB_ALIAS].__class__
+        shared = {**connection.settings_dict, "NAME": os.path.join(self.workdir, "db-old.sqlite3")}
+        switched, other = wrapper(shared, DEFAULT_DB_ALIAS), wrapper(shared, DEFAULT_DB_ALIAS)
+        with open(settings.DATABASE_POINTER_FILE, "w", encoding="utf-8") as pointer:
+            pointer.write("db-new.sqlite3")
+
+        with mock.patch.object(shadow, "connection", switched):
+            shadow.sync_active_database()
+
+        self.assertEqual(str(switched.settings_dict["NAME"]), os.path.join(self.workdir, "db-new.sqlite3"))
+        self.assertEqual(shared["NAME"], os.path.join(self.workdir, "db-old.sqlite3"))
+        self.assertIs(other.settings_dict, shared)
+
+
+class IncrementalLoadTests(TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        *self.entries, self.added = generate_products(5, weeks=3, seed=7)
+
+    def load(self, entries, **options):
+        path = os.path.join(self.workdir, "dataset.json")
+        with open(path, "w", encoding="utf-8") as stream:
+            json.dump({"version": "test", "products": entries}, stream)
+        output = io.StringIO()
+        call_command("load_kpis", dataset=path, stdout=output, **options)
+        return output.getvalue()
+
+    def test_only_changed_products_are_rewritten(self):
+        self.load(self.entries)
+        kept, changed, removed, _ = (entry["asin"] for entry in self.entries)
+        kept_sales = sorted(Sale.objects.filter(product__asin=kept).values_list("pk", flat=True))
+        SuggestedAction.objects.filter(product__asin=kept).update(action_text="Hand written", is_manual=True)
+
+        entries = copy.deepcopy(self.entries)
+        entries[1]["sales"][0]["units_sold"] += 100
+        entries[1]["returns"].append({"asin": changed, "return_reason": "Wrong color", "count": 4})
+        del entries[2]
+        entries.append(self.added)
+
+        output = self.load(entries, incremental=True)
+
+        self.assertIn("2 new or changed products, 2 unchanged, 1 removed.", output)
+        # Unchanged products keep their rows and their manual suggestion
+        self.assertEqual(sorted(Sale.objects.filter(product__asin=kept).values_list("pk", flat=True)), kept_sales)
+        self.assertEqual(SuggestedAction.objects.get(product__asin=kept).action_text, "Hand written")
+        self.assertFalse(Product.objects.filter(asin=removed).exists())
+        self.assertEqual(Product.objects.get(asin=self.added["asin"]).sale_set.count(), 3)
+        self.assertEqual(
+            Product.objects.get(asin=changed).total_units, sum(sale["units_sold"] for sale in entries[1]["sales"])
+        )
+
+        # The rollup deltas land on the same totals as a full reload of the same data
+        incremental = rollup_snapshot()
+        products = list(Product.objects.order_by("asin").values_list("asin", *AGGREGATE_FIELDS))
+        self.load(entries)
+        self.assertEqual(rollup_snapshot(), incremental)
+        self.assertEqual(list(Product.objects.order_by("asin").values_list("asin", *AGGREGATE_FIELDS)), products)
+
+
+class ParallelNormalisationTests(TestCase):
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        entries = list(generate_products(40, weeks=3, seed=11))
+        # Entries the normaliser reshapes: no ASIN, a repeated week, a repeated return reason
+        entries.insert(5, {"asin": " ", "product": "Nameless", "sales": [], "reviews": [], "returns": []})
+        entries[9]["sales"].append(dict(entries[9]["sales"][0], units_sold=999))
+        entries[12]["returns"] += [{"asin": entries[12]["asin"], "return_reason": "Late delivery", "count": 2}] * 2
+        self.path = os.path.join(workdir, "dataset.json")
+        with open(self.path, "w", encoding="utf-8") as stream:
+            json.dump({"version": "test", "products": entries}, stream)
+
+    def snapshot(self):
+        return (
+            list(Product.objects.order_by("asin").values_list("asin", "name", "fingerprint", *AGGREGATE_FIELDS)),
+            sorted(Sale.objects.values_list("product__asin", "week", "units_sold", "gmv", "refunds")),
+            sorted(Review.objects.values_list("product__asin", "review_text", "rating")),
+            sorted(Return.objects.values_list("product__asin", "reason__name", "count")),
+            rollup_snapshot(),
+        )
+
+    def test_worker_pool_matches_a_serial_run(self):
+        serial = list(iter_record_batches(self.path, 7, workers=1))
+        self.assertEqual(list(iter_record_batches(self.path, 7, workers=2)), serial)
+        self.assertIsNone(serial[0][5])
+
+        call_command("load_kpis", dataset=self.path, batch_size=7, stdout=io.StringIO())
+        expected = self.snapshot()
+        call_command("load_kpis", dataset=self.path, batch_size=7, workers=2, stdout=io.StringIO())
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_worker_decoding_errors_name_the_dataset(self):
+        with open(self.path, "w", encoding="utf-8") as stream:
+            stream.write('{"products": [{"asin": "A1"}, {"asin": A2}]}')
+
+        with self.assertRaisesRegex(ValueError, "^Malformed dataset: invalid value"):
+            list(iter_record_batches(self.path, 7, workers=2))
+
+
+class CsvIngestionTests(TestCase):
+    def write_feeds(self, sales, reviews, returns):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        feeds = {
+            "sde2_sales.csv": "asin,week,units_sold,gmv,refunds\n" + sales,
+            "sde2_reviews.csv": "asin,review_text,rating\n" + reviews,
+            "sde2_returns.csv": "asin,return_reason,count\n" + returns,
+        }
+        for name, content in feeds.items():
+            with open(os.path.join(workdir, name), "w", encoding="utf-8") as stream:
+                stream.write(content)
+        return workdir
+
+    def test_shipped_feeds_match_the_json_load(self):
+        fields = ("asin", "name", "average_rating", "total_gmv", "total_units", "total_refunds",
+                  "total_returns", "review_count", "rating_total")
+        call_command("load_kpis", stdout=io.StringIO())
+        from_json = list(Product.objects.order_by("asin").values_list(*fields))
+        weekly = list(WeeklyTotal.objects.order_by("week").values_list("week", "gmv", "units_sold", "sale_count"))
+
+        call_command("load_kpis", format="csv", stdout=io.StringIO())
+
+        self.assertEqual(list(Product.objects.order_by("asin").values_list(*fields)), from_json)
+        self.assertEqual(
+            list(WeeklyTotal.objects.order_by("week").values_list("week", "gmv", "units_sold", "sale_count")), weekly
+        )
+        self.assertEqual(DatasetLoad.objects.latest("pk").source_version, "csv")
+
+    def test_duplicates_merge_across_chunks(self):
+        directory = self.write_feeds(
+            sales="A1,1,5,50,1\n A1 ,2,3,30,0.6\n,1,9,90,9\nA1,1,7,70,2.7\n",
+            reviews="A1,Arrived broken,2\nA2,Great,\n",
+            returns="A1,Late delivery,2\nA2,Damaged item,1\nA1,Late delivery ,3\n",
+        )
+        output = io.StringIO()
+        call_command("load_kpis", format="csv", dataset=directory, chunk_rows=2, stdout=output)
+
+        first, second = Product.objects.get(asin="A1"), Product.objects.get(asin="A2")
+        # Week 1 repeats in a later chunk: the last row wins and is counted once
+        self.assertEqual(list(first.sale_set.order_by("week").values_list("week", "units_sold")), [(1, 7), (2, 3)])
+        self.assertEqual((first.total_units, first.total_gmv, first.total_refunds), (10, 100, 3))
+        self.assertEqual((first.total_returns, first.average_rating), (5, 2.0))
+        self.assertEqual((second.review_count, second.rating_total, second.name), (1, 0, "Unnamed Product"))
+        self.assertEqual(list(first.return_set.values_list("reason__name", "count")), [("Late delivery", 5)])
+        self.assertEqual(review_hits(["broken"]), {first.pk: 1})
+        self.assertIn("Skipped 1 CSV rows with missing ASIN", output.getvalue())
+
+        # The totals are exactly what the JSON path's aggregate refresh stores
+        fields = ["asin", *AGGREGATE_FIELDS]
+        loaded = list(Product.objects.order_by("asin").values_list(*fields))
+        refresh_product_aggregates()
+        self.assertEqual(list(Product.objects.order_by("asin").values_list(*fields)), loaded)
+
+    def test_csv_loads_are_full_loads_only(self):
+        with self.assertRaises(CommandError):
+            call_command("load_kpis", format="csv", incremental=True, stdout=io.StringIO())
+
+
+class RecommendationEngineTests(SimpleTestCase):
+    def test_matcher_reports_overlapping_and_prefix_keywords(self):
+        matcher = KeywordMatcher(["damage", "damaged item", "late", "delay"])
+        self.assertEqual(matcher.find("Damaged item, delayed"), {"damage", "damaged item", "delay"})
+
+    def test_ranking_is_deterministic_and_evidence_ordered(self):
+        engine = RecommendationEngine()
+        returns = [("Late delivery", 2), ("Damaged item", 9)]
+        reviews = ["Arrived broken", "Box was damaged"]
+        text = engine.evaluate(2.0, returns, reviews)
+
+        self.assertEqual(text, engine.evaluate(2.0, list(reversed(returns)), list(reversed(reviews))))
+        self.assertTrue(text.startswith("Immediate review required"))
+        self.assertLess(text.index("Enhance packaging"), text.index("Optimize supply chain"))
+
+
+class ReviewSearchTests(TestCase):
+    def setUp(self):
+        self.first, self.second = make_products(2)
+        Review.objects.bulk_create([
+            Review(product=self.first, review_text="Defective unit, arrived broken", rating=1),
+            Review(product=self.first, review_text="Broken again", rating=1),
+            Review(product=self.second, review_text="Arrived late but fine", rating=4),
+        ])
+
+    def test_index_matches_prefixes_and_phrases_and_follows_deletes(self):
+        self.assertEqual(review_hits(["defect"]), {self.first.pk: 1})
+        self.assertEqual(review_hits(["broken", "late"]), {self.first.pk: 2, self.second.pk: 1})
+        self.assertEqual(review_hits(["arrived late"]), {self.second.pk: 1})
+        self.assertEqual(review_hits(["!!"]), {})
+
+        Review.objects.filter(review_text="Broken again").delete()
+        self.assertEqual(review_hits(["broken"]), {self.first.pk: 1})
+
+    def test_search_endpoint_ranks_products_within_filters(self):
+        payload = self.client.get(reverse("review_search") + "?q=broken,arrived").json()
+        self.assertEqual(payload["reviews"], 3)
+        self.assertEqual([row["asin"] for row in payload["top_products"]], ["ASIN-0", "ASIN-1"])
+
+        narrowed = self.client.get(reverse("review_search") + "?q=broken,arrived&product=ASIN-1").json()
+        self.assertEqual(narrowed["top_products"], [{"asin": "ASIN-1", "name": "Product 1", "hits": 1}])
+
+    def test_suggestions_use_indexed_review_evidence(self):
+        generate_suggestions()
+        action = SuggestedAction.objects.get(product=self.first).action_text
+        self.assertIn("Strengthen pre-shipment inspection", action)
+
+    def test_suggestions_for_some_asins_count_only_their_reviews(self):
+        with mock.patch("products.recommendations.review_hits", wraps=review_hits) as counted:
+            generate_suggestions(asins=[self.first.asin])
+
+        self.assertTrue(counted.call_args_list)
+        self.assertTrue(all(call.args[1] == [self.first.pk] for call in counted.call_args_list))
+        self.assertIn("Strengthen pre-shipment inspection", SuggestedAction.objects.get(product=self.first).action_text)
+        self.assertFalse(SuggestedAction.objects.filter(product=self.second).exists())
+
+
+class GenerateSuggestionsTests(TestCase):
+    def test_manual_suggestions_are_kept(self):
+        first, second = make_products(2)
+        SuggestedAction.objects.create(product=first, action_text="Hand written", is_manual=True)
+
+        summary = generate_suggestions()
+
+        self.assertEqual(summary, {"created": 1, "updated": 0, "skipped": 1})
+        self.assertEqual(SuggestedAction.objects.get(product=first).action_text, "Hand written")
+        self.assertFalse(SuggestedAction.objects.get(product=second).is_manual)
+
+    def test_rerun_rewrites_automatic_rows_in_place(self):
+        make_products(3)
+        generate_suggestions()
+        before = dict(SuggestedAction.objects.values_list("product__asin", "pk"))
+        Product.objects.filter(asin="ASIN-0").update(average_rating=1.0)
+
+        with CaptureQueriesContext(connection) as small:
+            summary = generate_suggestions()
+
+        self.assertEqual(summary, {"created": 0, "updated": 3, "skipped": 0})
+        self.assertEqual(dict(SuggestedAction.objects.values_list("product__asin", "pk")), before)
+        self.assertIn("Immediate review required", SuggestedAction.objects.get(product__asin="ASIN-0").action_text)
+
+        make_products(60, prefix="MORE")
+        generate_suggestions()
+        with CaptureQueriesContext(connection) as large:
+            generate_suggestions()
+        # Existing rows are upserted, so the statement count does not grow with the chunk
+        self.assertEqual(len(large), len(small))
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        caches["dashboard"].clear()
+        make_products(2)
+        refresh_product_aggregates()
+
+    def test_repeat_requests_hit_the_cache_until_a_new_load(self):
+        url = reverse("product_dashboard") + "?rating=mid"
+        self.assertEqual(self.client.get(url)["X-Dashboard-Cache"], "miss")
+        with self.assertNumQueries(1):  # only the dataset version lookup
+            self.assertEqual(self.client.get(url)["X-Dashboard-Cache"], "hit")
+
+        DatasetLoad.objects.create(source_version="v2")
+        self.assertEqual(self.client.get(url)["X-Dashboard-Cache"], "miss")
+
+    def test_equivalent_filters_share_an_entry(self):
+        self.client.get(reverse("product_dashboard") + "?rating=mid")
+        response = self.client.get(reverse("product_dashboard") + "?rating=mid&product=&issue=")
+        self.assertEqual(response["X-Dashboard-Cache"], "hit")
+
+    def test_unchanged_dataset_answers_conditional_gets_with_304(self):
+        DatasetLoad.objects.create(source_version="v1")
+        for name in ("product_dashboard", "export_csv", "export_pdf"):
+            etag = self.client.get(reverse(name))["ETag"]
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        DatasetLoad.objects.create(source_version="v2")
+        self.assertEqual(self.client.get(reverse("export_csv"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class LRUFileBasedCacheTests(SimpleTestCase):
+    def test_cull_evicts_the_least_recently_read_entry(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        cache = LRUFileBasedCache(workdir, {"OPTIONS": {"MAX_ENTRIES": 3, "CULL_FREQUENCY": 3}})
+        for age, key in enumerate(["read", "unread", "newest"]):
+            cache.set(key, key)
+            # Spread the writes out so the order does not depend on the filesystem's mtime resolution
+            os.utime(cache._key_to_file(key), (1000 + age, 1000 + age))
+
+        self.assertEqual(cache.get("read"), "read")
+        cache.set("extra", "extra")  # a full cache culls one entry before writing
+
+        self.assertIsNone(cache.get("unread"))
+        self.assertEqual([cache.get(key) for key in ("read", "newest", "extra")], ["read", "newest", "extra"])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        caches["dashboard"].clear()
+        make_products(2)
+        refresh_product_aggregates()
+
+    def test_requests_and_sections_are_exported(self):
+        self.client.get(reverse("product_dashboard"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('merchtech_request_duration_seconds_bucket{view="product_dashboard",le="+Inf"}', body)
+        self.assertIn('merchtech_section_duration_seconds_count{section="kpi_aggregation"}', body)
+        self.assertIn("merchtech_dashboard_cache_misses_total", body)
+
+    def test_endpoint_is_local_only(self):
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1").status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs("products.metrics", "WARNING") as logs:
+            b"".join(self.client.get(reverse("export_csv")).streaming_content)
+        self.assertIn("(export_csv)", logs.output[0])
+        self.assertIn("sql x", logs.output[0])
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    """Runs on committed data, as the async view reads through its own worker-thread connections."""
+
+    def setUp(self):
+        caches["dashboard"].clear()
+        make_products(3)
+        refresh_product_aggregates()
+        rebuild_rollups()
+
+    def test_concurrent_blocks_match_the_sync_dashboard(self):
+        url = "?rating=mid"
+        expected = self.client.get(reverse("product_dashboard") + url).context
+        caches["dashboard"].clear()
+
+        response = async_to_sync(self.async_client.get)(reverse("product_dashboard_async") + url)
+        self.assertEqual(response["X-Dashboard-Cache"], "miss")
+        for key in ("total_gmv", "avg_rating", "periods", "gmv_change", "all_issues"):
+            self.assertEqual(response.context[key], expected[key], key)
+        self.assertEqual(response.context["products"], expected["products"]())
+
+        again = async_to_sync(self.async_client.get)(reverse("product_dashboard_async") + url)
+        self.assertEqual(again["X-Dashboard-Cache"], "hit")
+        not_modified = async_to_sync(self.async_client.get)(
+            reverse("product_dashboard_async"), headers={"if-none-match": again["ETag"]}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class XlsxExportTests(TestCase):
+    def setUp(self):
+        products = make_products(3)
+        reason_ids = ReturnReason.objects.intern(["Damaged"])
+        Return.objects.create(product=products[0], reason_id=reason_ids["Damaged"], count=4)
+        refresh_product_aggregates()
+        rebuild_rollups()
+
+    def export(self, query=""):
+        response = self.client.get(reverse("export_xlsx") + query)
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)), read_only=True)
+        return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+
+    def test_workbook_has_product_weekly_and_reason_sheets(self):
+        sheets = self.export()
+
+        self.assertEqual(list(sheets), ["Products", "Weekly Sales", "Return Reasons"])
+        self.assertEqual(len(sheets["Products"]), 4)
+        returns = {row[0]: row[XLSX_PRODUCT_COLUMNS.index("Total Returns")] for row in sheets["Products"][1:]}
+        self.assertEqual(returns, {"ASIN-0": 4, "ASIN-1": 0, "ASIN-2": 0})
+        self.assertEqual(sheets["Weekly Sales"][1:], [(1, 300, 30, 4.5), (2, 600, 60, 4.5)])
+        self.assertEqual(sheets["Return Reasons"][1:], [("Damaged", 4, 1)])
+
+    def test_filtered_workbook_only_covers_matching_products(self):
+        sheets = self.export("?product=ASIN-1")
+
+        self.assertEqual([row[0] for row in sheets["Products"][1:]], ["ASIN-1"])
+        self.assertEqual(sheets["Weekly Sales"][1:], [(1, 100, 10, 1.5), (2, 200, 20, 1.5)])
+        self.assertEqual(sheets["Return Reasons"][1:], [])
+
+
+class ProductApiTests(TestCase):
+    def setUp(self):
+        make_products(5)
+        refresh_product_aggregates()
+
+    def test_pages_cost_one_query_and_chain_by_cursor(self):
+        url, asins = reverse("api-product-list") + "?page_size=2&fields=asin,total_gmv", []
+        while url:
+            with self.assertNumQueries(1):
+                payload = self.client.get(url).json()
+            asins += [row["asin"] for row in payload["results"]]
+            url = payload["next"]
+
+        self.assertEqual(asins, [f"ASIN-{i}" for i in range(5)])
+        self.assertEqual(set(payload["results"][0]), {"asin", "total_gmv"})
+
+    def test_child_rows_share_the_dashboard_filters(self):
+        payload = self.client.get(reverse("api-sale-list") + "?product=ASIN-3").json()
+        self.assertEqual([(row["asin"], row["week"]) for row in payload["results"]], [("ASIN-3", 1), ("ASIN-3", 2)])
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get(reverse("api-product-list") + "?fields=asin,bogus").status_code, 400)
+
+
+class InlineExecutor:
+    """Executor stand-in that runs submitted jobs immediately."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.reports_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_root)
+        settings_override = override_settings(REPORTS_ROOT=self.reports_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        executor_patch = mock.patch("products.reports.get_executor", return_value=InlineExecutor())
+        executor_patch.start()
+        self.addCleanup(executor_patch.stop)
+        make_products(2)
+        refresh_product_aggregates()
+
+    def test_report_is_built_reused_and_downloadable(self):
+        payload = self.client.post(reverse("report_create", args=["csv"]) + "?rating=mid").json()
+        self.assertEqual(payload["status"], ReportJob.DONE)
+
+        again = self.client.post(reverse("report_create", args=["csv"]) + "?rating=mid&issue=")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()["id"], payload["id"])
+
+        download = self.client.get(payload["download_url"])
+        lines = b"".join(download.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[0], "ASIN")
+        self.assertEqual(len(lines), 3)
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.post(reverse("report_create", args=["doc"])).status_code, 404)
+
+    def test_queueing_requires_a_csrf_protected_post(self):
+        url = reverse("report_create", args=["csv"])
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.post(url).status_code, 403)
+        page = client.get(reverse("product_dashboard"))
+        self.assertContains(page, 'data-csrf="')
+        token = client.cookies["csrftoken"].value
+        self.assertEqual(client.post(url, headers={"X-CSRFToken": token}).status_code, 200)
+
+    def test_abandoned_jobs_are_requeued(self):
+        filters = {"product": "", "issue": "", "rating": ""}
+        with mock.patch("products.reports.get_executor", return_value=mock.Mock()):
+            orphan = enqueue_report("csv", filters)  # queued, but never picked up
+        self.assertEqual(enqueue_report("csv", filters).pk, orphan.pk)
+
+        # The queueing process has exited
+        exited = subprocess.Popen(["true"])
+        exited.wait()
+        ReportJob.objects.filter(pk=orphan.pk).update(worker_pid=exited.pid)
+        rebuilt = enqueue_report("csv", filters)
+        self.assertNotEqual(rebuilt.pk, orphan.pk)
+        self.assertEqual(rebuilt.status, ReportJob.DONE)
+        self.assertEqual(ReportJob.objects.get(pk=orphan.pk).status, ReportJob.FAILED)
+
+        # Still owned by a live process, but past the timeout
+        with mock.patch("products.reports.get_executor", return_value=mock.Mock()):
+            stuck = enqueue_report("pdf", filters)
+        ReportJob.objects.filter(pk=stuck.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(enqueue_report("pdf", filters).status, ReportJob.DONE)
+
+    def test_reports_of_older_dataset_versions_are_pruned(self):
+        filters = {"product": "", "issue": "", "rating": ""}
+        old = enqueue_report("csv", filters)
+        self.assertTrue(os.path.exists(old.file_path))
+
+        DatasetLoad.objects.create()
+        new = enqueue_report("csv", filters)
+
+        self.assertNotEqual(new.pk, old.pk)
+        self.assertFalse(os.path.exists(old.file_path))
+        self.assertFalse(ReportJob.objects.filter(pk=old.pk).exists())
+        self.assertEqual(os.listdir(self.reports_root), [os.path.basename(new.file_path)])
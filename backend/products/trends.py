@@ -0,0 +1,24 @@
+from django.db.models import Sum
+
+
+class WeeklyPivot:
+    """
+    Product × week grid of GMV and units built from a single grouped query over ``sales``.
+    Chart series and week-level totals are all shaped in memory from that one result.
+    """
+
+    def __init__(self, sales):
+        self.cells = {}
+        self.totals = {}
+        rows = sales.values("product_id", "week").annotate(gmv=Sum("gmv"), units=Sum("units_sold"))
+        for row in rows:
+            gmv, units = row["gmv"] or 0, row["units"] or 0
+            self.cells[(row["product_id"], row["week"])] = (gmv, units)
+            week_total = self.totals.setdefault(row["week"], {"gmv": 0, "units": 0})
+            week_total["gmv"] += gmv
+            week_total["units"] += units
+        self.weeks = sorted(self.totals)
+
+    def week_total(self, week, field="gmv"):
+        """Sum of ``field`` ('gmv' or 'units') across all products for one week."""
+        return self.totals.get(week, {}).get(field, 0)
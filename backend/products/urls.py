@@ -1,8 +1,27 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import api, views
+from .metrics import metrics_view
+
+router = DefaultRouter()
+router.register("products", api.ProductViewSet, basename="api-product")
+router.register("sales", api.SaleViewSet, basename="api-sale")
+router.register("returns", api.ReturnViewSet, basename="api-return")
+router.register("suggestions", api.SuggestedActionViewSet, basename="api-suggestion")
 
 urlpatterns = [
     path("", views.product_dashboard, name="product_dashboard"),
+    path("async/", views.product_dashboard_async, name="product_dashboard_async"),
     path("export/csv/", views.export_csv, name="export_csv"),
+    path("export/xlsx/", views.export_xlsx, name="export_xlsx"),
     path("export/pdf/", views.export_pdf, name="export_pdf"),
+    path("charts/gmv/", views.gmv_chart, name="gmv_chart"),
+    path("charts/reasons/", views.reason_chart, name="reason_chart"),
+    path("reviews/search/", views.review_search, name="review_search"),
+    path("api/", include(router.urls)),
+    path("metrics", metrics_view, name="metrics"),
+    path("reports/<str:kind>/", views.report_create, name="report_create"),
+    path("reports/job/<uuid:job_id>/", views.report_status, name="report_status"),
+    path("reports/job/<uuid:job_id>/download/", views.report_download, name="report_download"),
 ]
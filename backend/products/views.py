@@ -1,346 +1,390 @@
-import json
-import pandas as pd
-from datetime import datetime
-from django.db.models import Sum, Avg
-from django.shortcuts import render
-from django.http import HttpResponse
-from .models import Product, Sale, Return, Review, SuggestedAction
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-
-def safe_pct_change(current, previous):
-    """
-    Returns percentage change between two values.
-    Prevents division-by-zero and handles missing values gracefully.
-    """
-    if not previous or previous == 0:
-        return 0.0
-    return round(((current - previous) / previous) * 100, 1)
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.shortcuts import get_object_or_404, render
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from .cache import acached, cached, dataset_conditional, request_dataset_load
+from .charts import gmv_trend, reason_breakdown
+from .filters import dashboard_filters, dashboard_period, filter_products
+from .metrics import timed_section
+from .models import Product, ReportJob, ReturnReasonTotal
+from .periods import PERIODS, compare_periods, weekly_series
+from .reports import REPORT_FORMATS, XLSX_CONTENT_TYPE, build_pdf, build_xlsx, enqueue_report, iter_csv_rows
+from .review_search import review_hits
+from .shadow import sync_active_database
+from .summaries import iter_product_summaries
+
+
+REVIEW_SEARCH_LIMIT = 20
+# Chart payloads are bounded by these, whatever the catalogue size or history length
+GMV_CHART_TOP = 10
+REASON_CHART_TOP = 6
+CHART_TOP_LIMIT = 25
+CHART_POINTS = 104
+CHART_POINTS_LIMIT = 520
+
+
+def get_filtered_products(request):
+    """Reusable filter logic for dashboard and export views."""
+    return filter_products(dashboard_filters(request))
 
 
 # -------------------------------------------------------------------------
 # DASHBOARD VIEW
 # -------------------------------------------------------------------------
+@dataset_conditional
 def product_dashboard(request):
     """Main dashboard showing KPIs, trends, and actionable insights."""
-    selected_product = request.GET.get("product")
-    selected_issue = request.GET.get("issue")
-    selected_rating = request.GET.get("rating")
-
-    # --- Base queryset ---
-    products = Product.objects.all()
-    if selected_product:
-        products = products.filter(asin=selected_product)
-    if selected_rating == "low":
-        products = products.filter(average_rating__lt=3)
-    elif selected_rating == "mid":
-        products = products.filter(average_rating__gte=3, average_rating__lte=4)
-    elif selected_rating == "high":
-        products = products.filter(average_rating__gt=4)
-
-    # --- Related datasets ---
-    filtered_sales = Sale.objects.filter(product__in=products)
-    filtered_returns = Return.objects.filter(product__in=products)
-    filtered_reviews = Review.objects.filter(product__in=products)
-
-    all_issues = Return.objects.values_list("return_reason", flat=True).distinct()
-    all_products = Product.objects.all()
-
-    # ---------------------------------------------------------------------
-    # KPI METRICS
-    # ---------------------------------------------------------------------
-    total_gmv = filtered_sales.aggregate(total=Sum("gmv"))["total"] or 0
-    total_units = filtered_sales.aggregate(total=Sum("units_sold"))["total"] or 0
-    total_returns = filtered_returns.aggregate(total=Sum("count"))["total"] or 0
-    avg_rating = filtered_reviews.aggregate(avg=Avg("rating"))["avg"] or 0
-
-    # Calculate percentage of returns from total units sold
-    return_percentage = round((total_returns / total_units) * 100, 1) if total_units else 0.0
-
-    # ---------------------------------------------------------------------
-    # WEEKLY COMPARISON METRICS
-    # ---------------------------------------------------------------------
-    weeks = sorted(filtered_sales.values_list("week", flat=True).distinct())
-    if len(weeks) >= 2:
-        last_week, previous_week = weeks[-1], weeks[-2]
-
-        gmv_change = safe_pct_change(
-            filtered_sales.filter(week=last_week).aggregate(total=Sum("gmv"))["total"] or 0,
-            filtered_sales.filter(week=previous_week).aggregate(total=Sum("gmv"))["total"] or 0,
-        )
+    filters = dashboard_filters(request)
+    version = request_dataset_load(request)[0]
+
+    # Served from cache until the filters or the loaded dataset version change
+    context, hit = cached("dashboard", filters, lambda: build_dashboard_context(filters, version), version=version)
+    context = {
+        **context,
+        **period_deltas(context["periods"], dashboard_period(request)),
+        "dataset_version": version,
+        "selected_product": filters["product"],
+        "selected_issue": filters["issue"],
+        "selected_rating": filters["rating"],
+        # The table is only built when its template fragment cache misses
+        "products": lambda: build_product_rows(filters),
+    }
+
+    response = render(request, "dashboard.html", context)
+    response["X-Dashboard-Cache"] = "hit" if hit else "miss"
+    return response
+
 
-        units_change = safe_pct_change(
-            filtered_sales.filter(week=last_week).aggregate(total=Sum("units_sold"))["total"] or 0,
-            filtered_sales.filter(week=previous_week).aggregate(total=Sum("units_sold"))["total"] or 0,
+# -------------------------------------------------------------------------
+# ASYNC DASHBOARD VIEW (ASGI)
+# -------------------------------------------------------------------------
+_block_executor = None
+_block_executor_lock = threading.Lock()
+
+
+def get_block_executor():
+    """Process-local, bounded pool evaluating dashboard blocks (each thread owns its connection)."""
+    global _block_executor
+    with _block_executor_lock:
+        if _block_executor is None:
+            _block_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DASHBOARD_BLOCK_WORKERS", 4),
+                thread_name_prefix="dashboard",
+            )
+        return _block_executor
+
+
+def _run_block(func, *args):
+    close_old_connections()
+    sync_active_database()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_block(func, *args):
+    """Evaluate one synchronous dashboard block on the block pool."""
+    return await sync_to_async(_run_block, thread_sensitive=False, executor=get_block_executor())(func, *args)
+
+
+@dataset_conditional
+async def product_dashboard_async(request):
+    """
+    Same page as :func:`product_dashboard` for ASGI servers. On a cache miss the KPI,
+    period comparison, filter and table blocks are evaluated
+    concurrently, so latency follows the slowest block rather than their sum.
+    """
+    filters = dashboard_filters(request)
+    version = request_dataset_load(request)[0]
+    heavy = {}
+
+    async def compute():
+        kpis, periods, filter_options, heavy["products"] = await asyncio.gather(
+            run_block(build_kpi_block, filters),
+            run_block(build_period_comparison, filters),
+            run_block(cached_filter_options, version),
+            run_block(build_product_rows, filters),
         )
+        return assemble_dashboard_context(kpis, periods, filter_options)
+
+    context, hit = await acached("dashboard", filters, compute, version=version)
+    context = {
+        **context,
+        **period_deltas(context["periods"], dashboard_period(request)),
+        "dataset_version": version,
+        "selected_product": filters["product"],
+        "selected_issue": filters["issue"],
+        "selected_rating": filters["rating"],
+        # Already built on a miss; otherwise only evaluated if its fragment cache misses
+        "products": heavy.get("products", lambda: build_product_rows(filters)),
+    }
+
+    response = await sync_to_async(render)(request, "dashboard.html", context)
+    response["X-Dashboard-Cache"] = "hit" if hit else "miss"
+    return response
 
-        returns_change = safe_pct_change(total_returns, total_returns * 0.88)
-        rating_prev = filtered_reviews.aggregate(avg=Avg("rating"))["avg"] or 3.5
-        rating_change = round(avg_rating - rating_prev, 1)
-    else:
-        gmv_change = units_change = returns_change = rating_change = 0.0
-
-    # ---------------------------------------------------------------------
-    # GMV TREND (by Product and Week)
-    # ---------------------------------------------------------------------
-    trend_data = []
-    for product in products:
-        weekly_gmv = [
-            filtered_sales.filter(product=product, week=w).aggregate(total=Sum("gmv"))["total"] or 0
-            for w in weeks
-        ]
-        trend_data.append({"label": product.name, "data": weekly_gmv, "borderWidth": 2})
-
-    gmv_chart_data = json.dumps({
-        "labels": [f"Week {w}" for w in weeks],
-        "datasets": trend_data
-    })
 
-    # ---------------------------------------------------------------------
-    # RETURN REASONS (Top 6 by Count)
-    # ---------------------------------------------------------------------
-    reason_summary = (
-        filtered_returns.values("return_reason")
-        .annotate(total=Sum("count"))
-        .order_by("-total")[:6]
+def build_dashboard_context(filters, version=None):
+    """Compute the KPI and filter blocks for normalised filters; the result is request-independent and cacheable."""
+    return assemble_dashboard_context(
+        build_kpi_block(filters),
+        build_period_comparison(filters),
+        cached_filter_options(version),
     )
-    total_return_count = sum(r["total"] for r in reason_summary)
-
-    reason_chart_data = json.dumps({
-        "labels": [f"{r['return_reason']} ({r['total']} Returns)" for r in reason_summary],
-        "datasets": [{
-            "data": [r["total"] for r in reason_summary],
-            "backgroundColor": ["#ff6384", "#ff9f40", "#ffcd56", "#4bc0c0", "#36a2eb", "#9966ff"],
-        }],
-    })
 
-    # ---------------------------------------------------------------------
-    # PRODUCT PERFORMANCE TABLE
-    # ---------------------------------------------------------------------
-    product_rows = []
-    for product in products:
-        # Collect all return reasons with their counts
-        issue_summary = (
-            filtered_returns.filter(product=product)
-            .values("return_reason")
-            .annotate(total=Sum("count"))
-            .order_by("-total")
-        )
-        issue_dict = {i["return_reason"]: i["total"] for i in issue_summary}
 
-        # Suggested actions (AI/logic generated)
-        suggestion_obj = SuggestedAction.objects.filter(product=product).first()
-        suggestion = suggestion_obj.action_text if suggestion_obj else "No suggestion available"
+def assemble_dashboard_context(kpis, periods, filter_options):
+    """Merge the independently computed blocks into the cacheable dashboard context."""
+    return {**filter_options, **kpis, "periods": periods}
+
+
+def period_deltas(periods, period):
+    """KPI card deltas for the selected comparison window, picked from the cached comparisons."""
+    comparison = periods[period]
+    return {
+        "selected_period": period,
+        "period_choices": [(key, label) for key, (label, _) in PERIODS.items()],
+        "period_comparable": comparison["comparable"],
+        "period_span": "week" if comparison["weeks"] == 1 else f"{comparison['weeks']} weeks",
+        "gmv_change": comparison["change"]["gmv"],
+        "units_change": comparison["change"]["units"],
+        "refunds_change": comparison["change"]["refunds"],
+        # Reviews carry no week, so there is no honest per-period rating to compare
+        "rating_change": None,
+    }
+
+
+def cached_filter_options(version=None):
+    """Dropdown choices, built once per dataset version and shared by every filter combination."""
+    return cached("filter_options", {}, build_filter_options, version=version)[0]
+
+
+@timed_section("filter_options")
+def build_filter_options():
+    """Choices of the product and return-issue filter dropdowns."""
+    return {
+        "all_products": list(Product.objects.values("asin", "name")),
+        "all_issues": list(
+            ReturnReasonTotal.objects.order_by("reason__name").values_list("reason__name", flat=True)
+        ),
+    }
+
+
+@timed_section("kpi_aggregation")
+def build_kpi_block(filters):
+    """KPI cards, summed from the per-product rollups."""
+    totals = filter_products(filters).aggregate(
+        gmv=Sum("total_gmv"),
+        units=Sum("total_units"),
+        returns=Sum("total_returns"),
+        rating_total=Sum("rating_total"),
+        reviews=Sum("review_count"),
+    )
+    total_units = totals["units"] or 0
+    total_returns = totals["returns"] or 0
+    return {
+        "total_gmv": totals["gmv"] or 0,
+        "avg_rating": totals["rating_total"] / totals["reviews"] if totals["reviews"] else 0,
+        "total_units": total_units,
+        "total_returns": total_returns,
+        # Percentage of returns from total units sold
+        "return_percentage": round((total_returns / total_units) * 100, 1) if total_units else 0.0,
+    }
+
+
+@timed_section("period_comparison")
+def build_period_comparison(filters):
+    """Current-vs-previous GMV, units and refunds for every comparison window, from one grouped scan."""
+    products = filter_products(filters)
+    # Unfiltered views read catalogue-wide numbers straight from the load-time rollups
+    series = weekly_series(products if products.query.has_filters() else None)
+    return compare_periods(series)
+
 
+@timed_section("reason_chart")
+def build_reason_chart(filters, top=REASON_CHART_TOP):
+    """Return-reason doughnut chart: the ``top`` reasons by count and an "Other" slice."""
+    return reason_breakdown(filter_products(filters), top)
+
+
+@timed_section("trend_building")
+def build_gmv_chart(filters, top=GMV_CHART_TOP, points=CHART_POINTS):
+    """GMV trend chart: the ``top`` products by GMV and an "Other" series, at most ``points`` per series."""
+    return gmv_trend(filter_products(filters), top, points)
+
+
+@timed_section("table_building")
+def build_product_rows(filters):
+    """Rows of the product performance table."""
+    product_rows = []
+    for summary in iter_product_summaries(filter_products(filters)):
+        product = summary["product"]
         product_rows.append({
             "asin": product.asin,
             "name": product.name,
             "total_gmv": product.total_gmv,
             "average_rating": round(product.average_rating, 1),
             "total_refunds": product.total_refunds,
-            "all_issues": issue_dict,
-            "suggested_action": suggestion,
+            "all_issues": summary["issues"],
+            "suggested_action": summary["suggested_action"],
         })
-
-    # ---------------------------------------------------------------------
-    # RENDER THE DASHBOARD
-    # ---------------------------------------------------------------------
-    context = {
-        "products": product_rows,
-        "all_products": all_products,
-        "all_issues": all_issues,
-        "selected_product": selected_product,
-        "selected_issue": selected_issue,
-        "selected_rating": selected_rating,
-        "total_gmv": total_gmv,
-        "avg_rating": avg_rating,
-        "total_units": total_units,
-        "total_returns": total_returns,
-        "return_percentage": return_percentage,
-        "total_return_count": total_return_count,
-        "gmv_chart_data": gmv_chart_data,
-        "reason_chart_data": reason_chart_data,
-        "gmv_change": gmv_change,
-        "rating_change": rating_change,
-        "returns_change": returns_change,
-        "units_change": units_change,
-    }
-
-    return render(request, "dashboard.html", context)
+    return product_rows
 
 
 # -------------------------------------------------------------------------
-# CSV AND PDF EXPORT HELPERS
+# CHART DATA (fetched by the dashboard after first paint)
 # -------------------------------------------------------------------------
-def get_filtered_products(request):
-    """Reusable filter logic for dashboard and export views."""
-    selected_product = request.GET.get("product")
-    selected_rating = request.GET.get("rating")
+def _bounded_int(request, name, default, low, high):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        value = default
+    return max(low, min(high, value))
+
+
+@dataset_conditional
+def gmv_chart(request):
+    """GMV trend chart data for the dashboard filters; ``top`` products and ``points`` per series are bounded."""
+    filters = dashboard_filters(request)
+    top = _bounded_int(request, "top", GMV_CHART_TOP, 1, CHART_TOP_LIMIT)
+    points = _bounded_int(request, "points", CHART_POINTS, 3, CHART_POINTS_LIMIT)
+    payload, _ = cached(
+        "gmv_chart", {**filters, "top": top, "points": points}, lambda: build_gmv_chart(filters, top, points),
+        version=request_dataset_load(request)[0],
+    )
+    return JsonResponse(payload)
+
+
+@dataset_conditional
+def reason_chart(request):
+    """Return-reason chart data for the dashboard filters, with the ``top`` reasons and an "Other" slice."""
+    filters = dashboard_filters(request)
+    top = _bounded_int(request, "top", REASON_CHART_TOP, 1, CHART_TOP_LIMIT)
+    payload, _ = cached(
+        "reason_chart", {**filters, "top": top}, lambda: build_reason_chart(filters, top),
+        version=request_dataset_load(request)[0],
+    )
+    return JsonResponse(payload)
 
-    queryset = Product.objects.all()
-    if selected_product:
-        queryset = queryset.filter(asin=selected_product)
-    if selected_rating == "low":
-        queryset = queryset.filter(average_rating__lt=3)
-    elif selected_rating == "mid":
-        queryset = queryset.filter(average_rating__gte=3, average_rating__lte=4)
-    elif selected_rating == "high":
-        queryset = queryset.filter(average_rating__gt=4)
 
-    return queryset
+# -------------------------------------------------------------------------
+# REVIEW SEARCH
+# -------------------------------------------------------------------------
+@dataset_conditional
+def review_search(request):
+    """Products with the most reviews matching ``q`` (comma-separated words or phrases), within the filters."""
+    terms = [term.strip() for term in request.GET.get("q", "").split(",") if term.strip()]
+    hits = review_hits(terms, get_filtered_products(request)) if terms else {}
+    top = sorted(hits.items(), key=lambda item: (-item[1], item[0]))[:REVIEW_SEARCH_LIMIT]
+    products = {
+        pk: (asin, name) for pk, asin, name in
+        Product.objects.filter(pk__in=[product_id for product_id, _ in top]).values_list("pk", "asin", "name")
+    }
+    return JsonResponse({
+        "terms": terms,
+        "reviews": sum(hits.values()),
+        "products": len(hits),
+        "top_products": [
+            {"asin": products[product_id][0], "name": products[product_id][1], "hits": count}
+            for product_id, count in top
+        ],
+    })
 
 
+# -------------------------------------------------------------------------
+# CSV, XLSX AND PDF EXPORTS
+# -------------------------------------------------------------------------
+@dataset_conditional
 def export_csv(request):
-    """Exports filtered product data to a downloadable CSV file."""
+    """Streams filtered product data as a downloadable CSV file in constant memory."""
     products = get_filtered_products(request)
-    records = []
-
-    for product in products:
-        top_issue = (
-            Return.objects.filter(product=product)
-            .values("return_reason")
-            .annotate(total=Sum("count"))
-            .order_by("-total")
-            .first()
-        )
-        issue = top_issue["return_reason"] if top_issue else "N/A"
-
-        suggestion_obj = SuggestedAction.objects.filter(product=product).first()
-        suggestion = suggestion_obj.action_text if suggestion_obj else "No suggestion available"
-
-        records.append({
-            "ASIN": product.asin,
-            "Product": product.name,
-            "Average Rating": round(product.average_rating, 2),
-            "Total GMV ($)": round(product.total_gmv, 2),
-            "Units Sold": product.total_units,
-            "Total Returns": product.total_refunds,
-            "Top Issue": issue,
-            "Suggested Action": suggestion,
-        })
-
-    if not records:
+    if not products.exists():
         return HttpResponse("No data found for the selected filters.", content_type="text/plain")
 
-    df = pd.DataFrame(records)
-    response = HttpResponse(content_type="text/csv")
+    response = StreamingHttpResponse(iter_csv_rows(products), content_type="text/csv")
     response["Content-Disposition"] = 'attachment; filename="product_report.csv"'
-    df.to_csv(response, index=False)
     return response
 
 
+@dataset_conditional
+def export_xlsx(request):
+    """Exports the filtered products, weekly sales and return reasons as an Excel workbook."""
+    products = get_filtered_products(request)
+    if not products.exists():
+        return HttpResponse("No data found for the selected filters.", content_type="text/plain")
+
+    # Build into a temporary file so large workbooks never sit in memory as one response body
+    workbook_file = tempfile.TemporaryFile()
+    build_xlsx(workbook_file, products)
+    workbook_file.seek(0)
+    return FileResponse(
+        workbook_file,
+        as_attachment=True,
+        filename="product_report.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+@dataset_conditional
 def export_pdf(request):
-    """Exports product performance report to PDF with wrapped text and proper formatting."""
+    """Exports the filtered product performance report to PDF with wrapped text and proper formatting."""
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="product_performance_report.pdf"'
+    build_pdf(response, get_filtered_products(request))
+    return response
 
-    # --- PDF Setup ---
-    doc = SimpleDocTemplate(
-        response,
-        pagesize=letter,
-        leftMargin=40,
-        rightMargin=40,
-        topMargin=40,
-        bottomMargin=40
-    )
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Paragraph styles
-    header_style = ParagraphStyle(
-        name="HeaderCenter",
-        fontName="Helvetica-Bold",
-        fontSize=10,
-        alignment=TA_CENTER
-    )
-    normal_style = ParagraphStyle(
-        name="NormalLeft",
-        fontName="Helvetica",
-        fontSize=9,
-        leading=11,
-        alignment=TA_LEFT
-    )
 
-    # --- Title and Metadata ---
-    elements.append(Paragraph("■ Product Performance Report", styles['Title']))
-    elements.append(Paragraph(
-        f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        styles['Normal']
-    ))
-    elements.append(Paragraph("<br/>", styles['Normal']))
-
-    # --- Table Headers ---
-    headers = [
-        Paragraph("<b>Product Name</b>", header_style),
-        Paragraph("<b>GMV ($)</b>", header_style),
-        Paragraph("<b>Rating</b>", header_style),
-        Paragraph("<b>Return Rate (%)</b>", header_style),
-        Paragraph("<b>Top Issue</b>", header_style),
-        Paragraph("<b>Suggested Action</b>", header_style)
-    ]
-    table_data = [headers]
-
-    # --- Data Rows ---
-    products = Product.objects.all().order_by('name')
-    for p in products:
-        # calculate return rate
-        total_units = p.total_units or 0
-        return_rate = 0
-        if total_units > 0:
-            total_returns = Return.objects.filter(product=p).aggregate(total=Sum('count'))["total"] or 0
-            return_rate = round((total_returns / total_units) * 100, 1)
-
-        # top issue
-        top_issue = (
-            Return.objects.filter(product=p)
-            .values('return_reason')
-            .annotate(total=Sum('count'))
-            .order_by('-total')
-            .first()
-        )
-        issue_text = top_issue["return_reason"] if top_issue else "N/A"
-
-        # suggestion
-        suggestion_obj = SuggestedAction.objects.filter(product=p).first()
-        suggestion_text = suggestion_obj.action_text if suggestion_obj else "No suggestion available"
-
-        # use Paragraphs for wrapping
-        table_data.append([
-            Paragraph(p.name, normal_style),
-            Paragraph(f"${p.total_gmv:,.0f}", normal_style),
-            Paragraph(f"{p.average_rating:.1f}", normal_style),
-            Paragraph(f"{return_rate:.1f}%", normal_style),
-            Paragraph(issue_text, normal_style),
-            Paragraph(suggestion_text.replace(". ", ".<br/>"), normal_style)
-        ])
-
-    # --- Table Configuration ---
-    page_width = doc.width
-    weights = [18, 8, 6, 9, 14, 25]  # wider issue/suggestion columns
-    total_weight = sum(weights)
-    col_widths = [(w / total_weight) * page_width for w in weights]
-
-    table = Table(table_data, colWidths=col_widths, repeatRows=1)
-
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007BFF')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
-        ('LEFTPADDING', (0, 0), (-1, -1), 5),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-
-    elements.append(table)
-
-    # --- Build PDF ---
-    doc.build(elements)
-    return response
\ No newline at end of file
+# -------------------------------------------------------------------------
+# BACKGROUND REPORTS
+# -------------------------------------------------------------------------
+def _job_payload(job):
+    return {
+        "id": str(job.pk),
+        "kind": job.kind,
+        "status": job.status,
+        "dataset_version": job.dataset_version,
+        "filters": job.filters,
+        "error": job.error,
+        "status_url": reverse("report_status", args=[job.pk]),
+        "download_url": reverse("report_download", args=[job.pk]) if job.status == ReportJob.DONE else None,
+    }
+
+
+@require_POST
+def report_create(request, kind):
+    """Queues (or reuses) a background report build for the current filters."""
+    if kind not in REPORT_FORMATS:
+        raise Http404("Unknown report format.")
+    job = enqueue_report(kind, dashboard_filters(request))
+    return JsonResponse(_job_payload(job), status=200 if job.status == ReportJob.DONE else 202)
+
+
+def report_status(request, job_id):
+    """Current state of a report job."""
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return JsonResponse(_job_payload(job))
+
+
+def report_download(request, job_id):
+    """Serves a finished report file."""
+    job = get_object_or_404(ReportJob, pk=job_id)
+    if job.status != ReportJob.DONE or not os.path.exists(job.file_path):
+        return JsonResponse(_job_payload(job), status=409)
+
+    _, content_type, extension = REPORT_FORMATS[job.kind]
+    return FileResponse(
+        open(job.file_path, "rb"),
+        as_attachment=True,
+        filename=f"product_report_v{job.dataset_version}.{extension}",
+        content_type=content_type,
+    )